@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List
+
+from app.agents.master_agent import run_master_agent
+from app.config.settings import settings
+from app.utils import metrics
+from app.utils.llm import shared_response_cache
+
+
+def _normalize(item) -> Dict:
+    """Accept plain query strings or {"id": ..., "query": ...} records."""
+    if isinstance(item, str):
+        item = {"query": item}
+    query = item["query"]
+    item_id = item.get("id") or hashlib.sha1(query.encode()).hexdigest()[:12]
+    return {"id": str(item_id), "query": query}
+
+
+def load_checkpoint(path: str) -> Dict[str, Dict]:
+    """Completed records from an existing output file, keyed by id."""
+    done = {}
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn last line from an interrupted run
+                continue
+            if record.get("status") == "ok":
+                done[record["id"]] = record
+    return done
+
+
+async def run_master_agent_batch(queries: Iterable, concurrency: int | None = None,
+                                 checkpoint_path: str | None = None) -> List[Dict]:
+    """
+    Run many queries through the master agent with bounded parallelism.
+
+    Connector results and identical LLM requests are shared across the batch
+    (overlapping in-flight connector fetches are merged). When checkpoint_path is
+    given, each finished record is appended to it as a JSON line and records
+    already marked "ok" there are skipped, so an interrupted batch resumes where
+    it stopped.
+
+    Returns one record per input, in input order:
+        {"id", "query", "status": "ok" | "error", "output" | "error", "elapsed_s"}
+    """
+    items = [_normalize(q) for q in queries]
+    done = load_checkpoint(checkpoint_path)
+    # Items sharing an id (the same query without an explicit id) run once
+    pending = list({item["id"]: item for item in items if item["id"] not in done}.values())
+    # Graph checkpoints are keyed per batch so item ids never collide with
+    # another batch's; a resumed batch (same output file) finds its own again
+    if checkpoint_path:
+        batch_id = hashlib.sha1(os.path.abspath(checkpoint_path).encode()).hexdigest()[:12]
+    else:
+        batch_id = uuid.uuid4().hex[:12]
+    if done:
+        print(f"Resuming batch: {sum(1 for item in items if item['id'] in done)} of {len(items)} already complete")
+
+    semaphore = asyncio.Semaphore(concurrency or settings.BATCH_CONCURRENCY)
+    write_lock = threading.Lock()
+    results: Dict[str, Dict] = dict(done)
+    metrics.queue_depth.inc(len(pending), queue="batch")
+
+    def checkpoint(record: Dict) -> None:
+        if not checkpoint_path:
+            return
+        with write_lock:
+            with open(checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    async def run_one(item: Dict) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            record = {"id": item["id"], "query": item["query"]}
+            try:
+                # A crashed item resumes mid-graph when the batch is re-run
+                output = await run_master_agent(item["query"], raise_errors=True, job_id=f"{batch_id}:{item['id']}")
+                record.update(status="ok", output=output.model_dump())
+            except Exception as e:
+                print(f"Batch item {item['id']} failed: {e}")
+                record.update(status="error", error=str(e))
+            finally:
+                metrics.queue_depth.dec(queue="batch")
+            record["elapsed_s"] = round(time.perf_counter() - start, 3)
+            checkpoint(record)
+            results[item["id"]] = record
+
+    with shared_response_cache():
+        await asyncio.gather(*(run_one(item) for item in pending))
+
+    return [results[item["id"]] for item in items]
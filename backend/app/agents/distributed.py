@@ -0,0 +1,92 @@
+"""
+Worker side of distributed mode: claim tasks from the job queue and run them.
+
+Task payloads:
+    {"kind": "connector", "connector": "yc", "query": ..., "limit": ...}   topics browser / http
+    {"kind": "node", "node": "router", "state": {...MasterState...}}     topic llm
+
+Workers keep no state between tasks; everything a task needs is in its
+payload, so any number of them can serve the same topics on any number of
+machines.
+"""
+import os
+import socket
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from app.config.settings import settings
+from app.utils import metrics, tracing
+from app.utils.job_queue import current_job_id, get_queue
+
+
+def execute(task: Dict):
+    """Run one claimed task and return its JSON-serialisable result."""
+    payload = task["payload"]
+    kind = payload.get("kind")
+    if kind == "connector":
+        from app.tools.web_tools import CONNECTORS
+        connector = CONNECTORS[payload["connector"]]
+        return connector.fetch_signals(payload["query"], limit=payload["limit"])
+    if kind == "node":
+        from app.agents.master_agent import NODES, MasterState, node_update_to_json
+        from app.tools import prefetch
+        state = MasterState.model_validate(payload["state"])
+        try:
+            return node_update_to_json(NODES[payload["node"]](state))
+        finally:
+            # The job's next node may run anywhere, so nothing here could consume a prefetch
+            if state.job_id:
+                prefetch.cancel(state.job_id)
+    raise ValueError(f"Unknown task kind: {kind}")
+
+
+def _work(topics, worker: str, stop: threading.Event, poll_interval: float) -> None:
+    queue = get_queue()
+    while not stop.is_set():
+        task = queue.claim(topics, worker)
+        if task is None:
+            stop.wait(poll_interval)
+            continue
+        topic = task["topic"]
+        token = current_job_id.set(task["job_id"])
+        start = time.perf_counter()
+        try:
+            with tracing.span(f"worker.{topic}", task_id=task["id"], job_id=task["job_id"] or ""):
+                result = execute(task)
+            queue.complete(task["id"], result)
+            metrics.worker_tasks.inc(topic=topic, status="ok")
+        except Exception as e:
+            print(f"Task {task['id']} ({topic}) failed: {e}")
+            queue.fail(task["id"], f"{type(e).__name__}: {e}")
+            metrics.worker_tasks.inc(topic=topic, status="error")
+        finally:
+            current_job_id.reset(token)
+            metrics.worker_latency.observe(time.perf_counter() - start, topic=topic)
+
+
+def run_worker(topics: Iterable[str], concurrency: int = 1, poll_interval: float = 0.2,
+               stop: Optional[threading.Event] = None) -> None:
+    """
+    Serve `topics` with `concurrency` threads until `stop` is set. An llm
+    worker running web_intel waits on the connector tasks it submits, so give
+    llm workers more than one thread when they also serve browser/http.
+    """
+    topics = list(topics)
+    stop = stop or threading.Event()
+    # Workers run single graph nodes, so a router prefetch could never reach web intel
+    settings.SPECULATIVE_PREFETCH = False
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    threads = [
+        threading.Thread(target=_work, args=(topics, f"{worker}:{i}", stop, poll_interval), daemon=True)
+        for i in range(concurrency)
+    ]
+    for t in threads:
+        t.start()
+    print(f"Worker {worker} serving {', '.join(topics)} with {concurrency} thread(s)")
+    try:
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(timeout=0.5)
+    except KeyboardInterrupt:
+        stop.set()
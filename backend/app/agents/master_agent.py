@@ -1,57 +1,87 @@
-from langgraph.graph import StateGraph, END
 from pydantic import BaseModel
 from typing import Annotated
+import asyncio
+import contextlib
 import json
 import operator
+import threading
+import time
+import uuid
+from app.tools import history_index, prefetch, result_store
 from app.utils.schemas import RouterOutput, SynthOutput
-from app.utils.prompts import MASTER_AGENT_ROUTER_PROMPT, SYNTH_PROMPT
 from app.agents import (report_generator_agent, web_intel_agent)
 from app.config.settings import settings
-from openai import OpenAI
-# Initialize OpenAI client with Gemini API
-client = OpenAI(
-    api_key=settings.GOOGLE_API_KEY,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-)
+from app.utils import checkpointing, job_queue, metrics, profiling, prompt_registry, tracing
+from app.utils.checkpointing import get_checkpointer
+from app.utils.json_stream import stream_synth_completion
+from app.utils.llm import chat_completion
 
 
 
+# Agents the router may select; anything else it names is counted as "other"
+KNOWN_AGENTS = ("Web Intelligence Agent", "Report Generator Agent")
+
+# Per-job callbacks for streamed report events (see run_master_agent's on_event)
+_event_sinks = {}
+
+
+def _event_sink(job_id: str, source: str):
+    sink = _event_sinks.get(job_id)
+    if sink is None:
+        return None
+    return lambda event: sink(dict(event, source=source))
+
+
 class MasterState(BaseModel):
     """State for the master agent workflow"""
     query: str = ""
+    job_id: str = ""
     selected_agents: list = []
     routing_reason: str = ""
     results: dict = {}
     final_output: SynthOutput | None = None
 
 
+@tracing.traced("node.router")
 def router_node(state: MasterState) -> dict:
     """
     Routes the query to appropriate agents based on content analysis.
     Returns selected agents and reasoning.
-    """
-    system_prompt = """You are an intelligent router agent. Analyze user queries and determine which agents should handle them.
 
-Available agents:
-1. Web Intelligence Agent - Gathers and analyzes information from web sources
-2. Report Generator Agent - Creates comprehensive reports based on data
+    With HISTORY_CONTEXT, closely related past reports from the history index
+    are attached to the results as context; a near-identical one
+    (HISTORY_SHORTCUT_SCORE) skips the LLM routing call and the web search entirely.
 
-Respond in JSON format with:
-{"selected_agents": ["agent_name1", "agent_name2"], "reason": "explanation"}"""
-    
-    user_message = f"""Analyze this query and route it appropriately:
+    With SPECULATIVE_PREFETCH (local mode only) the connector fan-out starts
+    before the routing call and is cancelled if web intel is not selected.
+    """
+    # In distributed mode web intel runs as a separate task, possibly on another machine
+    if settings.SPECULATIVE_PREFETCH and state.job_id and not job_queue.distributed():
+        prefetch.start(state.job_id, state.query)
 
-Query: {state.query}
+    results = state.results.copy()
+    shortcut = settings.HISTORY_SHORTCUT_SCORE
+    related = []
+    if settings.HISTORY_CONTEXT or shortcut:
+        try:
+            with tracing.span("history.lookup") as s:
+                related = history_index.related_reports(state.query)
+                s.set_attribute("hits", len(related))
+        except Exception as e:
+            print(f"History lookup failed: {e}")
+    if related and shortcut and related[0]["score"] >= shortcut:
+        metrics.router_decisions.inc(agent="history")
+        prefetch.cancel(state.job_id)
+        results["history"] = related
+        return {
+            "selected_agents": ["Report Generator Agent"],
+            "routing_reason": f"Reusing past analysis of \"{related[0]['query']}\" (similarity {related[0]['score']})",
+            "results": results,
+        }
+    if related and settings.HISTORY_CONTEXT:
+        results["history"] = related
 
-{MASTER_AGENT_ROUTER_PROMPT}"""
-    
-    response = client.chat.completions.create(
-        model="gemini-3-flash-preview",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message}
-        ]
-    )
+    response = chat_completion(**prompt_registry.request("router", "gemini-3-flash-preview", query=state.query))
     
     try:
         content = response.choices[0].message.content
@@ -60,19 +90,27 @@ Query: {state.query}
         end_idx = content.rfind('}') + 1
         json_str = content[start_idx:end_idx]
         result = json.loads(json_str)
+        for agent in result.get("selected_agents", []):
+            metrics.router_decisions.inc(agent=agent if agent in KNOWN_AGENTS else "other")
+        if "Web Intelligence Agent" not in result.get("selected_agents", []):
+            prefetch.cancel(state.job_id)
         
         return {
             "selected_agents": result.get("selected_agents", []),
-            "routing_reason": result.get("reason", "")
+            "routing_reason": result.get("reason", ""),
+            "results": results,
         }
     except (json.JSONDecodeError, AttributeError, ValueError):
         # Fallback if parsing fails
+        metrics.router_decisions.inc(agent="default")
         return {
             "selected_agents": ["Web Intelligence Agent", "Report Generator Agent"],
-            "routing_reason": "Default routing due to parsing error"
+            "routing_reason": "Default routing due to parsing error",
+            "results": results,
         }
 
 
+@tracing.traced("node.web_intel")
 def web_intel_node(state: MasterState) -> dict:
     """
     Calls the web intelligence agent to gather web-based information.
@@ -80,8 +118,14 @@ def web_intel_node(state: MasterState) -> dict:
     if "Web Intelligence Agent" not in state.selected_agents:
         return {"results": state.results}
     
-    # Call web intelligence agent
-    web_result = web_intel_agent.run_web_intel_agent(state.query)
+    # A speculative prefetch started by the router supplies the documents
+    prefetched = prefetch.take(state.job_id) if state.job_id else None
+    try:
+        web_result = web_intel_agent.run_web_intel_agent(state.query, prefetched=prefetched)
+    finally:
+        if prefetched is not None:
+            # No-op once it finished; stops it if the agent never got to use it
+            prefetched.cancel()
     
     results = state.results.copy()
     # Convert SynthOutput to dict for JSON serialization
@@ -90,6 +134,7 @@ def web_intel_node(state: MasterState) -> dict:
     return {"results": results}
 
 
+@tracing.traced("node.report_generator")
 def report_generator_node(state: MasterState) -> dict:
     """
     Calls the report generator agent to create a comprehensive report.
@@ -98,53 +143,47 @@ def report_generator_node(state: MasterState) -> dict:
         return {"results": state.results}
     
     # Prepare context from previous results
-    context = json.dumps(state.results) if state.results else "No previous data"
+    results = state.results.copy()
+    if "web_intel" not in results and "history" in results:
+        # History shortcut: stand in previously gathered documents for a fresh search
+        try:
+            results["history_documents"] = history_index.related_documents(
+                state.query, k=settings.HISTORY_TOP_K * 5
+            )
+        except Exception as e:
+            print(f"History lookup failed: {e}")
+    context = json.dumps(results) if results else "No previous data"
     
     # Call report generator agent
     report_result = report_generator_agent.run_report_generator_agent(
         state.query, 
-        context
+        context,
+        on_event=_event_sink(state.job_id, "report_generator")
     )
     
-    results = state.results.copy()
     # Convert SynthOutput to dict for JSON serialization
     results["report"] = report_result.model_dump()
     
     return {"results": results}
 
 
+@tracing.traced("node.synthesizer")
 def synthesizer_node(state: MasterState) -> dict:
     """
     Synthesizes results from all agents into final output.
     """
-    results_context = json.dumps(state.results) if state.results else "No data available"
+    results = state.results
+    if not settings.HISTORY_CONTEXT:
+        # Past reports only shaped the report (history shortcut); keep them out of the final prompt
+        results = {k: v for k, v in results.items() if k not in ("history", "history_documents")}
+    results_context = json.dumps(results) if results else "No data available"
     
-    system_prompt = """You are a synthesis agent. Your job is to combine outputs from multiple agents into a comprehensive final response.
-
-Always respond with JSON format:
-{"final_summary": "text", "recommendations": "text", "tables": [], "charts": []}"""
-    
-    user_message = f"""Synthesize these results for the query.
-
-Original Query: {state.query}
-
-Agent Results:
-{results_context}
-
-{SYNTH_PROMPT}
-
-Provide a comprehensive final summary with recommendations."""
-    
-    response = client.chat.completions.create(
-        model="gemini-3-flash-preview",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message}
-        ]
+    content = stream_synth_completion(
+        _event_sink(state.job_id, "synthesizer"),
+        **prompt_registry.request("synthesizer", "gemini-3-flash-preview", query=state.query, results=results_context)
     )
     
     try:
-        content = response.choices[0].message.content
         # Try to extract JSON
         start_idx = content.find('{')
         end_idx = content.rfind('}') + 1
@@ -169,7 +208,7 @@ Provide a comprehensive final summary with recommendations."""
     except (json.JSONDecodeError, ValueError):
         return {
             "final_output": SynthOutput(
-                final_summary=response.choices[0].message.content,
+                final_summary=content,
                 recommendations="",
                 tables=[],
                 charts=[]
@@ -177,42 +216,205 @@ Provide a comprehensive final summary with recommendations."""
         }
 
 
-# Build the graph
-graph = StateGraph(MasterState)
+NODES = {
+    "router": router_node,
+    "web_intel": web_intel_node,
+    "report_generator": report_generator_node,
+    "synthesizer": synthesizer_node,
+}
+
+
+def node_update_to_json(update: dict) -> dict:
+    return {k: v.model_dump() if isinstance(v, BaseModel) else v for k, v in update.items()}
+
+
+def _remote_node(name: str, fn):
+    """Graph node that runs `fn` on an llm worker (distributed mode)."""
+    def run(state: MasterState) -> dict:
+        update = job_queue.run_remote(
+            "llm",
+            {"kind": "node", "node": name, "state": state.model_dump()},
+            fallback=lambda: fn(state),
+            job_id=state.job_id or None,
+        )
+        if isinstance(update.get("final_output"), dict):
+            update["final_output"] = SynthOutput(**update["final_output"])
+        return update
+    run.__name__ = fn.__name__
+    return run
+
+
+def _profiled_node(name: str, fn):
+    """Graph node that records its input state and update when the run is profiled."""
+    def run(state: MasterState) -> dict:
+        with profiling.stage(f"node.{name}", job_id=state.job_id or None, memory=True) as record:
+            if record is None:
+                return fn(state)
+            record["inputs"] = state.model_dump()
+            update = fn(state)
+            record["outputs"] = node_update_to_json(update)
+            return update
+    run.__name__ = fn.__name__
+    return run
 
-# Add nodes
-graph.add_node("router", router_node)
-graph.add_node("web_intel", web_intel_node)
-graph.add_node("report_generator", report_generator_node)
-graph.add_node("synthesizer", synthesizer_node)
 
-# Add edges
-graph.set_entry_point("router")
-graph.add_edge("router", "web_intel")
-graph.add_edge("web_intel", "report_generator")
-graph.add_edge("report_generator", "synthesizer")
-graph.add_edge("synthesizer", END)
+def _build_graph():
+    from langgraph.graph import StateGraph, END
 
-# Compile the graph
-master_chain = graph.compile()
+    graph = StateGraph(MasterState)
+
+    # Add nodes; in distributed mode each one is a task for the worker pool
+    for name, fn in NODES.items():
+        graph.add_node(name, _profiled_node(name, _remote_node(name, fn) if job_queue.distributed() else fn))
+
+    # Add edges
+    graph.set_entry_point("router")
+    graph.add_edge("router", "web_intel")
+    graph.add_edge("web_intel", "report_generator")
+    graph.add_edge("report_generator", "synthesizer")
+    graph.add_edge("synthesizer", END)
+
+    # Persist every completed node under the job id so retries resume from there
+    return graph.compile(checkpointer=get_checkpointer())
+
+
+_master_chain = None
+_master_chain_lock = threading.Lock()
+
+
+def get_master_chain():
+    """Compile the graph on first use and reuse it for every run."""
+    global _master_chain
+    if _master_chain is None:
+        with _master_chain_lock:
+            if _master_chain is None:
+                _master_chain = _build_graph()
+    return _master_chain
+
+
+def __getattr__(name):
+    # `master_chain` stays importable without compiling the graph at import time
+    if name == "master_chain":
+        return get_master_chain()
+    raise AttributeError(name)
+
+
+# Job ids with a graph run in progress in this process
+_running_jobs = set()
+_running_jobs_lock = threading.Lock()
+
+
+def _invoke_with_resume(state: MasterState, job_id: str):
+    """
+    Run the graph for `job_id`. If a checkpoint shows an earlier attempt at the
+    same query stopped part-way, continue from the last completed node instead
+    of starting over; failed attempts are retried the same way up to
+    MASTER_AGENT_RETRIES times. Checkpoints left by a different query under the
+    same id are discarded, and a finished job's checkpoints are deleted.
+    """
+    chain = get_master_chain()
+    if get_checkpointer() is None:
+        return chain.invoke(state)
+
+    with _running_jobs_lock:
+        if job_id in _running_jobs:
+            raise RuntimeError(f"Job {job_id} is already running")
+        _running_jobs.add(job_id)
+    try:
+        config = {"configurable": {"thread_id": job_id}}
+        attempts = settings.MASTER_AGENT_RETRIES + 1
+        for attempt in range(attempts):
+            snapshot = chain.get_state(config)
+            stored_query = snapshot.values.get("query")
+            if stored_query and stored_query != state.query:
+                # The id was reused for another query: never resume or return its state
+                print(f"Job {job_id} has checkpoints for a different query; starting over")
+                checkpointing.clear(job_id)
+                graph_input = state
+            elif snapshot.next:
+                print(f"Resuming job {job_id} at {', '.join(snapshot.next)}")
+                graph_input = None
+            elif snapshot.values.get("final_output") is not None:
+                # Job already finished earlier
+                checkpointing.clear(job_id)
+                return snapshot.values
+            else:
+                graph_input = state
+            try:
+                final_state = chain.invoke(graph_input, config)
+            except Exception as e:
+                if attempt == attempts - 1:
+                    raise
+                print(f"Job {job_id} failed ({e}); retrying from last checkpoint")
+                continue
+            checkpointing.clear(job_id)
+            return final_state
+    finally:
+        with _running_jobs_lock:
+            _running_jobs.discard(job_id)
+
+
+def _store_report(query: str, final_state, final_output: SynthOutput) -> None:
+    """Keep the report with the search and documents behind it, for refresh_master_agent."""
+    results = final_state.get("results", {}) if isinstance(final_state, dict) else final_state.results
+    web_intel = (results or {}).get("web_intel") or {}
+    try:
+        result_store.save_report(query, final_output.model_dump(), web_intel.get("search"), web_intel.get("doc_keys", []))
+    except Exception as e:
+        print(f"Could not store report: {e}")
+
+
+def resynthesize(query: str, web_intel: dict) -> SynthOutput:
+    """
+    Report generation and synthesis over an already gathered web intel result,
+    without routing or searching again (refresh_master_agent). The new report
+    replaces the stored one.
+    """
+    state = MasterState(
+        query=query,
+        selected_agents=["Web Intelligence Agent", "Report Generator Agent"],
+        results={"web_intel": web_intel},
+    )
+    for node in (report_generator_node, synthesizer_node):
+        state = state.model_copy(update=node(state))
+    _store_report(query, state, state.final_output)
+    return state.final_output
 
 
 # PUBLIC ENTRY FUNCTION
-async def run_master_agent(query: str):
+async def run_master_agent(query: str, raise_errors: bool = False, job_id: str | None = None,
+                           on_event=None, profile: bool | None = None):
     """
     Main entry point for the master agent.
     
     Args:
         query: The user query to process
+        raise_errors: Re-raise pipeline failures instead of returning an error SynthOutput
+        job_id: Checkpoint key; pass the id of a failed run to resume it from its last completed node
+        on_event: Called (from a worker thread) with the report generator's and
+            synthesizer's streamed events, each tagged with its "source" node;
+            see app.utils.json_stream for the event shapes
+        profile: Write replayable stage artifacts and CPU / memory profiles
+            under PROFILE_DIR (defaults to the PROFILE setting); see app.utils.profiling
         
     Returns:
         Final SynthOutput with results
     """
-    state = MasterState(query=query)
+    job_id = job_id or uuid.uuid4().hex
+    state = MasterState(query=query, job_id=job_id)
+    start = time.perf_counter()
+    job_token = job_queue.current_job_id.set(job_id)
+    if on_event is not None:
+        _event_sinks[job_id] = on_event
+    metrics.queue_depth.inc(queue="pipeline")
     
     try:
-        # Run the workflow synchronously and return result
-        final_state = master_chain.invoke(state)
+        # Run the synchronous workflow off the event loop so concurrent runs overlap
+        profile_run = profiling.profile_run(job_id, query) if profiling.enabled(profile) else contextlib.nullcontext()
+        with tracing.span("run_master_agent", query=query, job_id=job_id) as root, profile_run:
+            final_state = await asyncio.to_thread(_invoke_with_resume, state, job_id)
+        if tracing.get_exporter():
+            print(f"Trace id: {root.trace_id}")
         
         # Handle both dict and object returns from invoke
         if isinstance(final_state, dict):
@@ -220,6 +422,13 @@ async def run_master_agent(query: str):
         else:
             final_output = final_state.final_output
         
+        metrics.pipeline_requests.inc(status="ok" if final_output is not None else "empty")
+        if final_output is not None:
+            _store_report(query, final_state, final_output)
+            try:
+                history_index.add_report(query, final_output.model_dump())
+            except Exception as e:
+                print(f"Could not index report: {e}")
         if final_output is None:
             return SynthOutput(
                 final_summary="No output generated",
@@ -230,7 +439,10 @@ async def run_master_agent(query: str):
         
         return final_output
     except Exception as e:
-        print(f"Error in master agent: {str(e)}")
+        metrics.pipeline_requests.inc(status="error")
+        if raise_errors:
+            raise
+        print(f"Error in master agent (job {job_id}): {str(e)}")
         import traceback
         traceback.print_exc()
         return SynthOutput(
@@ -239,4 +451,34 @@ async def run_master_agent(query: str):
             tables=[],
             charts=[]
         )
+    finally:
+        prefetch.cancel(job_id)
+        _event_sinks.pop(job_id, None)
+        job_queue.current_job_id.reset(job_token)
+        metrics.queue_depth.dec(queue="pipeline")
+        metrics.pipeline_latency.observe(time.perf_counter() - start)
+
+
+async def stream_master_agent(query: str, job_id: str | None = None):
+    """
+    Async generator over a run's streamed events: report_generator and
+    synthesizer field deltas / tables / charts as they arrive, then
+    {"type": "final", "output": SynthOutput}.
+    """
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
 
+    def on_event(event):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    run = asyncio.create_task(run_master_agent(query, job_id=job_id, on_event=on_event))
+    while not run.done():
+        next_event = asyncio.ensure_future(events.get())
+        done, _ = await asyncio.wait({next_event, run}, return_when=asyncio.FIRST_COMPLETED)
+        if next_event in done:
+            yield next_event.result()
+        else:
+            next_event.cancel()
+    while not events.empty():
+        yield events.get_nowait()
+    yield {"type": "final", "output": run.result()}
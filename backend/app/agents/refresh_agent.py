@@ -0,0 +1,58 @@
+import asyncio
+from typing import Dict
+
+from app.agents import web_intel_agent
+from app.agents.master_agent import resynthesize, run_master_agent
+from app.config.settings import settings
+from app.tools import result_store
+from app.tools.relevance import filter_relevant
+from app.tools.web_tools import plan_sources, search_all
+from app.utils.schemas import SynthOutput
+
+
+async def refresh_master_agent(query: str, force: bool = False) -> Dict:
+    """
+    Refresh a previously analyzed query without redoing unchanged work.
+
+    1. Load the stored report and the search it was built from.
+    2. Re-run that search over the same sources (or, for reports stored before
+       sources were recorded, today's schedule without random exploration);
+       search_all serves every source still inside its SOURCE_TTLS window from
+       the result store and re-fetches only stale ones.
+    3. Diff the relevant documents against the report's. Only when the added +
+       removed share reaches REFRESH_CHANGE_THRESHOLD (or `force` is set) are the
+       LLM steps re-run over the refreshed documents: web intel summary and
+       analysis, report generation and synthesis. Routing and the tool-calling
+       search step are never repeated.
+
+    Returns {"status": "unchanged" | "resynthesized" | "full_run", "output": SynthOutput,
+             "added": [...], "removed": [...]}
+    """
+    report = result_store.load_report(query)
+    if report is None or not report.get("search"):
+        output = await run_master_agent(query)
+        return {"status": "full_run", "output": output, "added": [], "removed": []}
+
+    # Same sources as the report, without exploration, so the diff only shows changed documents
+    search = dict(report["search"])
+    search["sources"] = search.get("sources") or plan_sources(search["query"], explore=False)
+    docs = await asyncio.to_thread(
+        search_all, search["query"], search.get("limit", 5), search.get("types"), sources=search["sources"]
+    )
+    # The stored keys are of the documents that passed the relevance filter
+    relevant = await asyncio.to_thread(filter_relevant, query, docs)
+
+    old_keys = set(report["doc_keys"])
+    new_keys = {result_store.doc_key(d) for d in relevant}
+    added = sorted(new_keys - old_keys)
+    removed = sorted(old_keys - new_keys)
+    change = (len(added) + len(removed)) / max(len(old_keys), 1)
+
+    if not force and change < settings.REFRESH_CHANGE_THRESHOLD:
+        result_store.touch_report(query)
+        return {"status": "unchanged", "output": SynthOutput(**report["output"]), "added": added, "removed": removed}
+
+    print(f"Refresh: {len(added)} new / {len(removed)} dropped documents, re-running synthesis")
+    web_intel = await asyncio.to_thread(web_intel_agent.analyze_documents, query, search, docs, relevant)
+    output = await asyncio.to_thread(resynthesize, query, web_intel)
+    return {"status": "resynthesized", "output": output, "added": added, "removed": removed}
@@ -1,15 +1,10 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Callable, List, Optional
 import json
 from app.utils.schemas import SynthOutput, TableSpec, ChartSpec
 from app.config.settings import settings
-from openai import OpenAI
-
-
-client = OpenAI(
-    api_key=settings.GOOGLE_API_KEY,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-)
+from app.utils import prompt_registry
+from app.utils.json_stream import stream_synth_completion
 
 
 class ReportState(BaseModel):
@@ -20,45 +15,29 @@ class ReportState(BaseModel):
     final_report: str = ""
 
 
-def run_report_generator_agent(query: str, context: str = "") -> SynthOutput:
+def run_report_generator_agent(query: str, context: str = "",
+                               on_event: Optional[Callable[[dict], None]] = None) -> SynthOutput:
     """
     Report Generator Agent - Creates comprehensive reports based on data.
     
     Args:
         query: The original user query
         context: Context from previous agents
+        on_event: Receives final_summary / recommendations deltas and each
+            finished table / chart while the report streams in
         
     Returns:
         SynthOutput with comprehensive report
     """
     try:
-        # Build the message
+        # Static instructions go first so the prompt prefix is identical on every call
         context_str = f"\nContext from previous analysis:\n{context}" if context else ""
         
-        message = f"""You are a professional report generator. Create a comprehensive report based on the following:
-
-User Query: {query}
-{context_str}
-
-Generate a professional report with:
-1. Executive Summary
-2. Key Findings
-3. Recommendations
-4. Conclusions
-
-Format the response as JSON with:
-{{"final_summary": "summary text", "recommendations": "recommendations text", "tables": [], "charts": []}}
-"""
-        
-        response = client.chat.completions.create(
-            model="gemini-3-flash-preview",
-            messages=[
-                {"role": "user", "content": message}
-            ]
+        content = stream_synth_completion(
+            on_event,
+            **prompt_registry.request("report_generator", "gemini-3-flash-preview", query=query, context=context_str)
         )
         
-        content = response.choices[0].message.content
-        
         try:
             # Try to parse JSON response
             start_idx = content.find('{')
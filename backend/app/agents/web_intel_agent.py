@@ -1,15 +1,14 @@
-from openai import OpenAI
 from app.config.settings import settings
 import json
-from app.tools.web_tools import search_all
-from app.utils.prompts import WEB_INTEL_SYSTEM_PROMPT, WEB_INTEL_SUMMARY_PROMPT, MASTER_PROMPT
+from app.tools import connector_stats, history_index
+from app.tools.relevance import filter_relevant
+from app.tools.result_store import doc_key
+from app.tools.web_tools import connector_for_doc, plan_sources, search_all
+from app.utils import metrics, prompt_registry, tracing
+from app.utils.llm import chat_completion
 from .base_agent import BaseAgent
 
 
-client = OpenAI(
-    api_key=settings.GOOGLE_API_KEY,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-)
 
 tools = [
     {
@@ -60,6 +59,7 @@ def _choose_quotes_from_docs(docs, max_quotes=2, max_words=25):
             break
     return quotes[:max_quotes]
 
+@tracing.traced("web_intel.synthesize_summary")
 def synthesize_summary(query: str, documents: list):
     # Build docs_payload including full_text when available
     docs_payload = []
@@ -68,21 +68,18 @@ def synthesize_summary(query: str, documents: list):
             "title": d.get("title"),
             "url": d.get("url"),
             "snippet": d.get("snippet"),
-            "full_text": d.get("full_text", ""),
+            # Connectors already cap full_text; the cut here also covers stored results
+            "full_text": (d.get("full_text") or "")[:settings.FULL_TEXT_INLINE_CHARS],
             "source": d.get("source"),
             "type": d.get("type"),
             "date": d.get("date")
         })
 
-    messages = [
-        {"role": "system", "content": WEB_INTEL_SUMMARY_PROMPT},
-        {"role": "user", "content": f"Create a concise structured summary for the query: {query}"},
-        {"role": "assistant", "content": json.dumps(docs_payload)}
-    ]
-
-    response = client.chat.completions.create(
-        model="gemini-2.5-flash",
-        messages=messages,
+    response = chat_completion(
+        **prompt_registry.request(
+            "web_intel_summary", "gemini-2.5-flash", query=query,
+            extra_messages=[{"role": "assistant", "content": json.dumps(docs_payload)}]
+        ),
         temperature=0.0
     )
     msg = response.choices[0].message
@@ -121,19 +118,70 @@ def synthesize_summary(query: str, documents: list):
     }
     return out
 
-def handle_user_query(user_query: str):
+def _count_by_connector(docs: list) -> dict:
+    counts = {}
+    for d in docs:
+        name = connector_for_doc(d)
+        if name:
+            counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+@tracing.traced("web_intel.analyze_documents")
+def analyze_documents(user_query: str, search: dict, docs: list, relevant: list | None = None) -> dict:
+    """
+    Filter, summarize and analyze the documents search_all returned for
+    `search` ({"query", "limit", "types", "sources"}). `relevant` skips the relevance
+    filter when the caller already ran it. Returns the web intel result.
+    """
+    query = search["query"]
+    if relevant is None:
+        with tracing.span("relevance.filter", docs_in=len(docs)) as s:
+            relevant = filter_relevant(user_query, docs)
+            s.set_attribute("docs_out", len(relevant))
+    metrics.relevance_dropped.inc(len(docs) - len(relevant))
+    # Sources that ran and returned nothing count as zero-yield runs
+    retrieved = dict.fromkeys(search.get("sources") or [], 0)
+    retrieved.update(_count_by_connector(docs))
+    try:
+        connector_stats.record_yield(query, retrieved, _count_by_connector(relevant))
+    except Exception as e:
+        print(f"Could not record connector yield: {e}")
+    try:
+        history_index.add_documents(user_query, relevant)
+    except Exception as e:
+        print(f"Could not index documents: {e}")
+    summary = synthesize_summary(query, relevant)
+    # Static analysis instructions first, then the (compact) data
+    response = chat_completion(
+        **prompt_registry.request(
+            "master", "gemini-2.5-flash",
+            docs_array=json.dumps(relevant, separators=(",", ":")),
+            summary_array=json.dumps(summary, separators=(",", ":"))
+        ),
+        temperature=0.0
+    )
+    final_result = response.choices[0].message.content
+    return {
+        "query": query,
+        "documents_count": len(relevant),
+        "search": search,
+        "doc_keys": [doc_key(d) for d in relevant],
+        "result": final_result
+    }
+
+
+@tracing.traced("web_intel.handle_user_query")
+def handle_user_query(user_query: str, prefetched=None):
     """
     Orchestrator:
     - Ask the LLM (system prompt) to call search_web tool
-    - Execute search_web when requested by the LLM
+    - Execute search_web when requested by the LLM, or use the documents of
+      `prefetched` (app.tools.prefetch.Prefetch) when it ran the same search
     - Call LLM synthesizer for final structured summary
     """
-    response = client.chat.completions.create(
-        model="gemini-2.5-flash",
-        messages=[
-            {"role": "system", "content": WEB_INTEL_SYSTEM_PROMPT},
-            {"role": "user", "content": user_query}
-        ],
+    response = chat_completion(
+        **prompt_registry.request("web_intel_tool", "gemini-2.5-flash", query=user_query),
         tools=tools,
         tool_choice="auto"
     )
@@ -149,38 +197,32 @@ def handle_user_query(user_query: str):
         print("LLM called tool: search_web")
         print("Args:", args)
 
-        docs = search_all(query, limit=limit, types=types)
+        # The prefetch searched the user's own wording; its documents stand in for
+        # this search only when the tool call asked for exactly that search
+        same_search = prefetched is not None and (prefetched.query, prefetched.limit) == (query, limit)
+        if prefetched is not None and not same_search:
+            prefetched.cancel()
+        docs = prefetched.result() if same_search else None
+        if docs:
+            sources = prefetched.sources
+            if types:
+                docs = [d for d in docs if d.get("type") in types]
+        else:
+            sources = plan_sources(query)
+            docs = search_all(query, limit=limit, types=types, sources=sources)
         print(f"Retrieved {len(docs)} documents from connectors")
-        summary = synthesize_summary(query, docs)
-        final_prompt = MASTER_PROMPT.format(
-            docs_array=json.dumps(docs, indent=2),
-            summary_array=json.dumps(summary, indent=2)
-        )
-
-        messages=[
-            {"role": "user", "content": final_prompt}
-        ],
-        response = client.chat.completions.create(
-            model="gemini-2.5-flash",
-            messages=messages,
-            temperature=0.0
-        )
-        final_result = response.choices[0].message.content
-        return {
-            "query": query,
-            "documents_count": len(docs),
-            "result": final_result
-        }
+        search = {"query": query, "limit": limit, "types": types, "sources": sources}
+        return analyze_documents(user_query, search, docs)
     
     # If no tool used, return LLM content (unlikely with strict prompt)
     return {"response": message.content}
 
-def run_web_intel_agent(query: str):
+def run_web_intel_agent(query: str, prefetched=None):
     """
     Main entry point for the web intelligence agent.
     Called by master agent to process queries.
     """
-    return handle_user_query(query)
+    return handle_user_query(query, prefetched=prefetched)
 
 class WebIntelligenceAgent(BaseAgent):
 
@@ -0,0 +1,43 @@
+import argparse
+import asyncio
+import json
+from app.agents.batch_agent import run_master_agent_batch
+from app.config.settings import settings
+from app.utils.metrics import start_metrics_server
+
+
+def read_queries(path: str) -> list:
+    """JSONL input: one {"id": ..., "query": ...} object (or bare query) per line."""
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                queries.append(json.loads(line))
+            except json.JSONDecodeError:
+                queries.append(line)
+    return queries
+
+
+async def main():
+    parser = argparse.ArgumentParser(prog="python -m app.batch", description="Run many queries through the master agent")
+    parser.add_argument("input", help="JSONL file of queries")
+    parser.add_argument("output", help="JSONL results file; also the checkpoint an interrupted run resumes from")
+    parser.add_argument("--concurrency", type=int, default=None)
+    args = parser.parse_args()
+
+    if settings.METRICS_PORT:
+        start_metrics_server(settings.METRICS_PORT, settings.METRICS_HOST)
+
+    queries = read_queries(args.input)
+    print(f"\nBatch: {len(queries)} queries\n")
+    results = await run_master_agent_batch(queries, concurrency=args.concurrency, checkpoint_path=args.output)
+
+    failed = [r for r in results if r["status"] != "ok"]
+    print(f"Done: {len(results) - len(failed)} ok, {len(failed)} failed. Results in {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
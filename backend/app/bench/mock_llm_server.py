@@ -0,0 +1,231 @@
+"""
+Local OpenAI-compatible chat completion stub for load tests.
+
+Point the agents at it with LLM_BASE_URL (any non-empty GOOGLE_API_KEY works):
+
+    python -m app.bench.mock_llm_server --port 8089 --latency lognormal:-1.2,0.5 --error-rate 0.01
+    LLM_BASE_URL=http://127.0.0.1:8089/v1/ GOOGLE_API_KEY=mock python -m app.main
+
+Responses are deterministic for a given model + message list. The body is one
+JSON object carrying every field the router, web-intel and synthesis parsers
+read, so each stage of the graph gets something it can parse. When the
+request offers tools (and no tool result is in the conversation yet) the stub
+answers with a tool call to the first tool, like the real model would.
+`stream: true` is answered with SSE chunks.
+
+Latency specs: fixed:S | uniform:LO,HI | lognormal:MU,SIGMA (seconds).
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+
+class LatencyModel:
+    def __init__(self, spec: str = "fixed:0"):
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",") if p] or [0.0]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.params[0], self.params[1])
+        if self.kind == "lognormal":
+            return rng.lognormvariate(self.params[0], self.params[1])
+        return self.params[0]
+
+
+class MockConfig:
+    def __init__(self, latency: str = "fixed:0", error_rate: float = 0.0,
+                 error_codes: Tuple[int, ...] = (429, 500, 503), seed: int = 0, chunk_size: int = 24):
+        self.latency = LatencyModel(latency)
+        self.error_rate = error_rate
+        self.error_codes = error_codes
+        self.chunk_size = chunk_size
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def draw(self) -> Tuple[float, Optional[int]]:
+        with self.lock:
+            self.requests += 1
+            delay = self.latency.sample(self.rng)
+            error = self.rng.choice(self.error_codes) if self.rng.random() < self.error_rate else None
+        return delay, error
+
+
+def _digest(body: Dict) -> str:
+    canonical = json.dumps({"model": body.get("model"), "messages": body.get("messages")}, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _last_user_text(messages: List[Dict]) -> str:
+    for m in reversed(messages):
+        if m.get("role") == "user" and isinstance(m.get("content"), str):
+            return m["content"]
+    return ""
+
+
+def _count_tokens(messages: List[Dict]) -> int:
+    return sum(len(str(m.get("content") or "")) for m in messages) // 4 + 1
+
+
+def build_content(body: Dict, digest: str) -> str:
+    text = _last_user_text(body.get("messages", []))[:120]
+    tag = digest[:8]
+    return json.dumps({
+        "selected_agents": ["Web Intelligence Agent", "Report Generator Agent"],
+        "reason": f"mock routing {tag}",
+        "final_summary": f"Mock summary {tag} for: {text}",
+        "recommendations": f"Mock recommendations {tag}",
+        "tables": [{"title": "Mock table", "columns": ["Signal", "Value"], "rows": [["mock", tag]]}],
+        "charts": [{"title": "Mock chart", "labels": ["a", "b"], "values": [1.0, 2.0]}],
+        "summary": [f"Mock finding {tag}"],
+        "quotes": [],
+        "top_sources": [],
+        "notes": "mock",
+    })
+
+
+def build_tool_call(body: Dict, digest: str) -> Optional[Dict]:
+    tools = body.get("tools") or []
+    messages = body.get("messages", [])
+    if not tools or body.get("tool_choice") == "none" or any(m.get("role") == "tool" for m in messages):
+        return None
+    fn = tools[0].get("function", {})
+    return {
+        "id": f"call_{digest[:12]}",
+        "type": "function",
+        "function": {"name": fn.get("name", "tool"), "arguments": json.dumps({"query": _last_user_text(messages), "limit": 6})},
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    config: MockConfig = MockConfig()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        delay, error = self.config.draw()
+        if delay > 0:
+            time.sleep(delay)
+        if error:
+            self._send_json(error, {"error": {"message": f"mock error {error}", "type": "mock_error", "code": error}})
+            return
+
+        digest = _digest(body)
+        model = body.get("model", "mock")
+        created = int(time.time())
+        tool_call = build_tool_call(body, digest)
+        content = None if tool_call else build_content(body, digest)
+        prompt_tokens = _count_tokens(body.get("messages", []))
+        completion_tokens = len(content or "") // 4 + 1
+        finish_reason = "tool_calls" if tool_call else "stop"
+
+        if body.get("stream"):
+            self._stream(digest, model, created, content, tool_call, finish_reason)
+            return
+
+        message = {"role": "assistant", "content": content}
+        if tool_call:
+            message["tool_calls"] = [tool_call]
+        self._send_json(200, {
+            "id": f"chatcmpl-{digest[:16]}",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    def _stream(self, digest, model, created, content, tool_call, finish_reason):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def chunk(delta: Dict, finish: Optional[str] = None) -> None:
+            payload = {
+                "id": f"chatcmpl-{digest[:16]}", "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+            self.wfile.flush()
+
+        chunk({"role": "assistant", "content": ""})
+        if tool_call:
+            chunk({"tool_calls": [dict(tool_call, index=0)]})
+        else:
+            size = self.config.chunk_size
+            for i in range(0, len(content), size):
+                chunk({"content": content[i:i + size]})
+        chunk({}, finish_reason)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def start_mock_llm_server(port: int = 0, host: str = "127.0.0.1", config: Optional[MockConfig] = None) -> MockLLMServer:
+    """Start the stub on a daemon thread; returns the server (server.server_address has the bound port)."""
+    handler = type("MockHandler", (_Handler,), {"config": config or MockConfig()})
+    server = MockLLMServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.bench.mock_llm_server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:S | uniform:LO,HI | lognormal:MU,SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-codes", default="429,500,503")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.error_rate, tuple(int(c) for c in args.error_codes.split(",")), args.seed)
+    server = MockLLMServer((args.host, args.port), type("MockHandler", (_Handler,), {"config": config}))
+    print(f"Mock LLM listening on http://{args.host}:{args.port}/v1/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
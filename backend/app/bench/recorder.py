@@ -0,0 +1,114 @@
+"""
+Record/replay layer for outbound HTTP, browser scrapes and LLM calls.
+
+Connectors go through app.tools.http_client, the YC scraper through
+intercept("browser", ...) and every chat completion through
+app.utils.llm.chat_completion; all three consult the active cassette:
+
+    with use_cassette("app/bench/cassettes/default.json", mode="record"):
+        search_all("hospital queue management")   # live, responses saved
+
+    with use_cassette("app/bench/cassettes/default.json", mode="replay",
+                      latency={"http": 0.2, "browser": 3.0, "llm": 1.5}):
+        search_all("hospital queue management")   # offline, fixed latency
+"""
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = "replay", latency: Optional[Dict[str, float]] = None,
+                 passthrough: Tuple[str, ...] = ()):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency or {}
+        self.passthrough = passthrough
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries", {})
+
+    @staticmethod
+    def key(kind: str, request: Any) -> str:
+        canonical = json.dumps({"kind": kind, "request": request}, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def intercept(self, kind: str, request: Any, live: Callable[[], Any],
+                  dump: Callable[[Any], Any] = lambda r: r, load: Callable[[Any], Any] = lambda r: r) -> Any:
+        if kind in self.passthrough:
+            return live()
+        key = self.key(kind, request)
+        if self.mode == "replay":
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded {kind} response for {json.dumps(request, default=str)[:200]}")
+            self.hits += 1
+            delay = self.latency.get(kind, 0)
+            if delay:
+                time.sleep(delay)
+            return load(entry["response"])
+
+        response = live()
+        with self._lock:
+            self.entries[key] = {"kind": kind, "request": request, "response": dump(response)}
+        return response
+
+    def save(self) -> None:
+        if self.mode != "record":
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"entries": self.entries}, f, indent=1, default=str)
+
+
+# Context-local, so a profiled run recording its own cassette does not capture
+# the calls of runs next to it; threads that run a caller's work (connector
+# pool, prefetch, scraper) start from a copy of the caller's context
+_active: contextvars.ContextVar[Optional[Cassette]] = contextvars.ContextVar("cassette", default=None)
+
+
+def active_cassette() -> Optional[Cassette]:
+    return _active.get()
+
+
+@contextmanager
+def use_cassette(path: str, mode: str = "replay", latency: Optional[Dict[str, float]] = None,
+                 passthrough: Tuple[str, ...] = ()):
+    """
+    Activate a cassette for the current context and the threads it hands work to.
+    Kinds listed in `passthrough` always go live, e.g. ("llm",) with a mock LLM server.
+    """
+    cassette = Cassette(path, mode=mode, latency=latency, passthrough=passthrough)
+    token = _active.set(cassette)
+    try:
+        yield cassette
+    finally:
+        _active.reset(token)
+        cassette.save()
+
+
+def intercept(kind: str, request: Any, live: Callable[[], Any], **codec) -> Any:
+    """Route a call through the active cassette, or straight to `live` when none is active."""
+    cassette = _active.get()
+    if cassette is None:
+        return live()
+    return cassette.intercept(kind, request, live, **codec)
@@ -0,0 +1,287 @@
+"""
+Offline benchmark harness for the analysis pipeline.
+
+Runs search_all, handle_user_query and run_master_agent at several concurrency
+levels against a recorded cassette (see app.bench.recorder) and reports
+throughput, p50/p95/p99 latency and per-scenario peak RSS (Linux). Persistent local stores are
+switched off (ISOLATED_SETTINGS) so runs do not feed each other. Results are
+written as JSON so a later run can be compared against them:
+
+    # record once against live services
+    python -m app.bench --mode record --scenarios run_master_agent --concurrency 1
+
+    # replay offline, with injected latency, and compare with a stored run
+    python -m app.bench --latency llm=1.5,http=0.2,browser=3 --baseline bench_results/v1.json
+
+    # LLM calls served by the local stub (app.bench.mock_llm_server) instead of the cassette
+    python -m app.bench --mock-llm lognormal:-1.2,0.5 --concurrency 16,64 --requests 500
+
+    # cold-start check: fail when importing the pipeline exceeds the budget
+    python -m app.bench --scenarios import --import-budget 0.5
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+from app.bench.mock_llm_server import MockConfig, start_mock_llm_server
+from app.bench.recorder import use_cassette
+from app.config.settings import settings
+
+DEFAULT_CASSETTE = os.path.join(os.path.dirname(__file__), "cassettes", "default.json")
+DEFAULT_QUERIES = [
+    "hospital queue management",
+    "small restaurant inventory tracking",
+    "freelancer invoice reminders",
+    "college hostel maintenance complaints",
+]
+
+
+def _search_all(query: str):
+    from app.tools.web_tools import search_all
+    return search_all(query)
+
+
+def _handle_user_query(query: str):
+    from app.agents.web_intel_agent import handle_user_query
+    return handle_user_query(query)
+
+
+def _run_master_agent(query: str):
+    from app.agents.master_agent import run_master_agent
+    return asyncio.run(run_master_agent(query))
+
+
+SCENARIOS: Dict[str, Callable[[str], object]] = {
+    "search_all": _search_all,
+    "handle_user_query": _handle_user_query,
+    "run_master_agent": _run_master_agent,
+}
+
+
+# Local state a run would otherwise leave for the next one to read: stored
+# connector results, report history, connector stats (which reschedule and skip
+# sources), graph checkpoints, the cross-run LLM response cache and the
+# in-process connector caches (a zero TTL everywhere, so every request fetches;
+# identical fetches in flight at the same moment are still merged)
+ISOLATED_SETTINGS = {
+    "SOURCE_TTLS": "",
+    "CONNECTOR_CACHE_TTL": 0,
+    "RESULTS_DB": "",
+    "VECTOR_INDEX_PATH": "",
+    "CONNECTOR_STATS_DB": "",
+    "CHECKPOINT_BACKEND": "none",
+    "LLM_CACHE_TTL": 0,
+}
+
+
+def isolate_settings() -> None:
+    """Keep every benchmark run independent of earlier runs and of production data."""
+    for key, value in ISOLATED_SETTINGS.items():
+        setattr(settings, key, value)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's peak-RSS mark so the next reading covers one scenario (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float | None:
+    """Peak RSS since the last reset_peak_rss(), or None where it cannot be reset."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def run_scenario(name: str, queries: List[str], concurrency: int, requests: int) -> Dict:
+    fn = SCENARIOS[name]
+    latencies: List[float] = []
+    errors = 0
+
+    def one(i: int):
+        start = time.perf_counter()
+        fn(queries[i % len(queries)])
+        return time.perf_counter() - start
+
+    # ru_maxrss only ever grows across scenarios, so use the resettable mark instead
+    peak_known = reset_peak_rss()
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # The cassette is context-local, so each request runs in a copy of this context
+        for future in [pool.submit(contextvars.copy_context().run, one, i) for i in range(requests)]:
+            try:
+                latencies.append(future.result())
+            except Exception as e:
+                errors += 1
+                print(f"{name} request failed: {e}")
+    wall = time.perf_counter() - wall_start
+    peak = peak_rss_mb() if peak_known else None
+
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+    }
+
+
+IMPORT_MODULE = "app.agents.master_agent"
+
+
+def measure_import(module: str = IMPORT_MODULE, runs: int = 5) -> Dict:
+    """Median wall time of importing `module` in a fresh interpreter (cold start)."""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+        if out.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed: {out.stderr.strip().splitlines()[-1:]}")
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return {
+        "scenario": f"import:{module}",
+        "concurrency": 1,
+        "requests": runs,
+        "errors": 0,
+        "throughput_rps": 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 1),
+        "p95_ms": round(percentile(samples, 95) * 1000, 1),
+        "p99_ms": round(percentile(samples, 99) * 1000, 1),
+        "peak_rss_mb": 0.0,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return a line per scenario/concurrency whose p95 or throughput regressed beyond tolerance."""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in current["results"]:
+        old = previous.get((r["scenario"], r["concurrency"]))
+        if not old:
+            continue
+        if old["p95_ms"] and r["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{r['scenario']}@{r['concurrency']}: p95 {old['p95_ms']}ms -> {r['p95_ms']}ms")
+        if old["throughput_rps"] and r["throughput_rps"] < old["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{r['scenario']}@{r['concurrency']}: throughput {old['throughput_rps']} -> {r['throughput_rps']} rps")
+    return regressions
+
+
+def _git_version() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def _parse_latency(spec: str) -> Dict[str, float]:
+    latency = {}
+    for part in filter(None, spec.split(",")):
+        kind, _, seconds = part.partition("=")
+        latency[kind.strip()] = float(seconds)
+    return latency
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.bench", description="Offline pipeline benchmarks")
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    parser.add_argument("--mode", choices=["replay", "record"], default="replay")
+    parser.add_argument("--latency", default="", help="Injected replay latency, e.g. llm=1.5,http=0.2,browser=3")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Any of {', '.join(SCENARIOS)}, import")
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per scenario and concurrency level")
+    parser.add_argument("--queries", help="File with one query per line")
+    parser.add_argument("--out", default="bench_results")
+    parser.add_argument("--baseline", help="Earlier result JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--mock-llm", metavar="LATENCY", help="Serve LLM calls from the local stub with this latency spec, e.g. fixed:0.5")
+    parser.add_argument("--mock-error-rate", type=float, default=0.0)
+    parser.add_argument("--import-budget", type=float, help="Seconds allowed for a cold import of the pipeline")
+    args = parser.parse_args(argv)
+
+    isolate_settings()
+    passthrough = ()
+    if args.mock_llm:
+        # get_client() keys its shared client on these settings, so later calls hit the stub
+        server = start_mock_llm_server(config=MockConfig(args.mock_llm, args.mock_error_rate))
+        settings.LLM_BASE_URL = f"http://127.0.0.1:{server.server_address[1]}/v1/"
+        settings.GOOGLE_API_KEY = settings.GOOGLE_API_KEY or "mock"
+        passthrough = ("llm",)
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    results = []
+    scenarios = args.scenarios.split(",")
+    if "import" in scenarios:
+        scenarios.remove("import")
+        row = measure_import()
+        results.append(row)
+        print(json.dumps(row))
+
+    with use_cassette(args.cassette, mode=args.mode, latency=_parse_latency(args.latency), passthrough=passthrough) as cassette:
+        for name in scenarios:
+            for concurrency in [int(c) for c in args.concurrency.split(",")]:
+                row = run_scenario(name, queries, concurrency, args.requests)
+                results.append(row)
+                print(json.dumps(row))
+        print(f"Cassette {args.mode}: {cassette.hits} hits, {cassette.misses} misses")
+
+    report = {
+        "version": _git_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "mode": args.mode,
+        "latency": _parse_latency(args.latency),
+        "mock_llm": args.mock_llm,
+        "results": results,
+    }
+    os.makedirs(args.out, exist_ok=True)
+    out_path = os.path.join(args.out, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {out_path}")
+
+    failures = []
+    if args.import_budget is not None:
+        for row in results:
+            if row["scenario"].startswith("import:") and row["p50_ms"] > args.import_budget * 1000:
+                failures.append(f"{row['scenario']}: {row['p50_ms']}ms exceeds budget of {args.import_budget * 1000:.0f}ms")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures.extend(compare(report, json.load(f), args.tolerance))
+    for line in failures:
+        print(f"REGRESSION {line}")
+    return 1 if failures else 0
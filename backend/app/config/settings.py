@@ -1,13 +1,122 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
 
 class Settings:
-    def __init__(self):
-        self.GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-        self.SUPABASE_URL = os.getenv("SUPABASE_URL")
-        self.SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-        self.PROMPTS_PATH = os.getenv("PROMPTS_PATH")  
-        self.PH_API_TOKEN = os.getenv("PH_API_TOKEN")
-settings = Settings()
\ No newline at end of file
+    """
+    Environment-backed configuration. `.env` is read on first attribute access
+    instead of at import time; attributes assigned before that (e.g. by the
+    benchmark harness) win over the environment.
+    """
+    def _load(self):
+        from dotenv import load_dotenv
+        load_dotenv()
+
+        env = {
+            "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY"),
+            # OpenAI-compatible endpoint; point at app.bench.mock_llm_server for load tests
+            "LLM_BASE_URL": os.getenv("LLM_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/"),
+            "SUPABASE_URL": os.getenv("SUPABASE_URL"),
+            "SUPABASE_KEY": os.getenv("SUPABASE_KEY"),
+            "PROMPTS_PATH": os.getenv("PROMPTS_PATH"),
+            # JSON file {"name": {"system": ..., "user": ...}} overriding prompt_registry templates
+            "PROMPT_OVERRIDES": os.getenv("PROMPT_OVERRIDES"),
+            "PH_API_TOKEN": os.getenv("PH_API_TOKEN"),
+            # Connector result cache lifetime (seconds; 0 disables the in-process caches)
+            "CONNECTOR_CACHE_TTL": int(os.getenv("CONNECTOR_CACHE_TTL", "900")),
+            # Directory of recorded Reddit listings; when set the Reddit connector runs offline
+            "REDDIT_FIXTURES_PATH": os.getenv("REDDIT_FIXTURES_PATH"),
+            # Span export: none / console / file (OTLP JSON lines)
+            "TRACE_EXPORTER": os.getenv("TRACE_EXPORTER", "none"),
+            "TRACE_FILE": os.getenv("TRACE_FILE", "logs/traces.jsonl"),
+            # Port for the /metrics endpoint; unset disables it. Bound to localhost unless
+            # METRICS_HOST says otherwise (e.g. 0.0.0.0 behind a scraper-only network)
+            "METRICS_PORT": int(os.getenv("METRICS_PORT", "0")) or None,
+            "METRICS_HOST": os.getenv("METRICS_HOST", "127.0.0.1"),
+            # Reuse identical LLM responses for this many seconds (0 = only inside batches)
+            "LLM_CACHE_TTL": int(os.getenv("LLM_CACHE_TTL", "0")),
+            # Cap on HTTP bodies read by scrapers (bytes); longer pages are truncated
+            "HTTP_MAX_BYTES": int(os.getenv("HTTP_MAX_BYTES", str(2 * 1024 * 1024))),
+            # Document full_text kept (chars); longer texts are cut
+            "FULL_TEXT_INLINE_CHARS": int(os.getenv("FULL_TEXT_INLINE_CHARS", "4000")),
+            # Local relevance filter: minimum cosine score, floor on kept docs, optional
+            # sentence-transformers model (hashed TF-IDF when unset)
+            "RELEVANCE_THRESHOLD": float(os.getenv("RELEVANCE_THRESHOLD", "0.05")),
+            "RELEVANCE_MIN_KEEP": int(os.getenv("RELEVANCE_MIN_KEEP", "3")),
+            "RELEVANCE_MODEL": os.getenv("RELEVANCE_MODEL"),
+            # Explicit provider context cache for static prompt prefixes: "" (off) / gemini;
+            # lifetime (s) and the estimated prompt size below which it is not attempted
+            "LLM_CONTEXT_CACHE": os.getenv("LLM_CONTEXT_CACHE", ""),
+            "LLM_CONTEXT_CACHE_TTL": int(os.getenv("LLM_CONTEXT_CACHE_TTL", "3600")),
+            "LLM_CONTEXT_CACHE_MIN_TOKENS": int(os.getenv("LLM_CONTEXT_CACHE_MIN_TOKENS", "1024")),
+            # Graph checkpoints: sqlite / memory / none
+            "CHECKPOINT_BACKEND": os.getenv("CHECKPOINT_BACKEND", "sqlite"),
+            "CHECKPOINT_DB": os.getenv("CHECKPOINT_DB", "data/checkpoints.sqlite"),
+            # Connector latency / yield history ("" disables adaptive scheduling) and the
+            # scheduler: samples window, minimum samples before stats are trusted,
+            # deadline = p95 x factor clamped to [min, max] (default before enough samples),
+            # share of expected relevant docs to aim for, and chance of still running a skipped source
+            "CONNECTOR_STATS_DB": os.getenv("CONNECTOR_STATS_DB", "data/connector_stats.sqlite"),
+            "CONNECTOR_STATS_WINDOW": int(os.getenv("CONNECTOR_STATS_WINDOW", "200")),
+            "CONNECTOR_MIN_SAMPLES": int(os.getenv("CONNECTOR_MIN_SAMPLES", "5")),
+            "CONNECTOR_DEADLINE_FACTOR": float(os.getenv("CONNECTOR_DEADLINE_FACTOR", "1.5")),
+            "CONNECTOR_DEADLINE_MIN": float(os.getenv("CONNECTOR_DEADLINE_MIN", "2")),
+            "CONNECTOR_DEADLINE_MAX": float(os.getenv("CONNECTOR_DEADLINE_MAX", "90")),
+            "CONNECTOR_DEFAULT_DEADLINE": float(os.getenv("CONNECTOR_DEFAULT_DEADLINE", "90")),
+            "SOURCE_TARGET_RECALL": float(os.getenv("SOURCE_TARGET_RECALL", "0.95")),
+            "SOURCE_EXPLORE_RATE": float(os.getenv("SOURCE_EXPLORE_RATE", "0.1")),
+            # Stored connector results / reports used by incremental refresh ("" disables)
+            "RESULTS_DB": os.getenv("RESULTS_DB", "data/results.sqlite"),
+            # Per-source freshness, e.g. "yc=86400,ph=21600,devpost=86400,reddit=3600"
+            "SOURCE_TTLS": os.getenv("SOURCE_TTLS", "yc=86400,ph=21600,devpost=86400,reddit=3600"),
+            # Fraction of added/removed documents that makes a refresh re-run synthesis
+            "REFRESH_CHANGE_THRESHOLD": float(os.getenv("REFRESH_CHANGE_THRESHOLD", "0.2")),
+            # Vector index of past reports and documents (off unless set, e.g. data/vector_index);
+            # hashed-vector width, neighbours looked up, minimum similarity, whether they are
+            # passed to the report generator and synthesizer as context, and the similarity
+            # at which a past report replaces the web search (unset = never)
+            "VECTOR_INDEX_PATH": os.getenv("VECTOR_INDEX_PATH", ""),
+            "VECTOR_INDEX_DIM": int(os.getenv("VECTOR_INDEX_DIM", "512")),
+            "HISTORY_TOP_K": int(os.getenv("HISTORY_TOP_K", "3")),
+            "HISTORY_MIN_SCORE": float(os.getenv("HISTORY_MIN_SCORE", "0.6")),
+            "HISTORY_CONTEXT": os.getenv("HISTORY_CONTEXT", "0").lower() in ("1", "true", "yes"),
+            "HISTORY_SHORTCUT_SCORE": float(os.getenv("HISTORY_SHORTCUT_SCORE", "0")) or None,
+            # Start search_all alongside the router LLM call instead of after it
+            "SPECULATIVE_PREFETCH": os.getenv("SPECULATIVE_PREFETCH", "0").lower() in ("1", "true", "yes"),
+            # local runs everything in-process; distributed runs graph nodes and connector
+            # fetches as tasks on QUEUE_URL (sqlite:///path or redis://host) for `python -m app.worker`
+            "EXECUTION_MODE": os.getenv("EXECUTION_MODE", "local"),
+            "QUEUE_URL": os.getenv("QUEUE_URL", "sqlite:///data/queue.sqlite"),
+            # Seconds before an unclaimed task runs locally, a task is given up on, and a
+            # claimed task is handed to another worker
+            "QUEUE_CLAIM_TIMEOUT": float(os.getenv("QUEUE_CLAIM_TIMEOUT", "30")),
+            "QUEUE_TASK_TIMEOUT": float(os.getenv("QUEUE_TASK_TIMEOUT", "900")),
+            "QUEUE_VISIBILITY_TIMEOUT": float(os.getenv("QUEUE_VISIBILITY_TIMEOUT", "1800")),
+            # Seconds a finished task (payload and result) is kept for job_results before it is deleted
+            "QUEUE_RESULT_TTL": float(os.getenv("QUEUE_RESULT_TTL", "3600")),
+            # Topics a worker serves unless --topics is given
+            "WORKER_TOPICS": os.getenv("WORKER_TOPICS", "browser,http,llm"),
+            # Write stage inputs/outputs, a cassette of external calls, CPU profiles and
+            # tracemalloc snapshots of every run_master_agent call under PROFILE_DIR
+            "PROFILE": os.getenv("PROFILE", "0").lower() in ("1", "true", "yes"),
+            "PROFILE_DIR": os.getenv("PROFILE_DIR", "profiles"),
+            # cprofile, or pyinstrument if installed
+            "PROFILE_ENGINE": os.getenv("PROFILE_ENGINE", "cprofile"),
+            "PROFILE_TRACEMALLOC_FRAMES": int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "25")),
+            # In-process retries of a failed run, each resuming from its last checkpoint
+            "MASTER_AGENT_RETRIES": int(os.getenv("MASTER_AGENT_RETRIES", "1")),
+            # Queries processed in parallel by run_master_agent_batch
+            "BATCH_CONCURRENCY": int(os.getenv("BATCH_CONCURRENCY", "4")),
+        }
+        for key, value in env.items():
+            self.__dict__.setdefault(key, value)
+        self.__dict__["_loaded"] = True
+
+    def __getattr__(self, name):
+        # Only reached for attributes not set yet
+        if name.startswith("_") or self.__dict__.get("_loaded"):
+            raise AttributeError(name)
+        self._load()
+        return getattr(self, name)
+
+
+settings = Settings()
@@ -1,8 +1,13 @@
 import asyncio
 from app.agents.master_agent import run_master_agent
+from app.config.settings import settings
+from app.utils.metrics import start_metrics_server
 
 
 async def main():
+    if settings.METRICS_PORT:
+        start_metrics_server(settings.METRICS_PORT, settings.METRICS_HOST)
+
     print("\nMaster Agent")
     user_query = input("\nEnter your query: ")
 
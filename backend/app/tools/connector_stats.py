@@ -0,0 +1,202 @@
+"""
+Per-connector latency / error / yield history and the scheduler built on it.
+
+search_all records every network fetch (latency, success, documents returned)
+and web intel records how many of each source's documents survived the
+relevance filter, both per query class. `plan` turns the recent history into a
+per-request schedule:
+
+- each connector's deadline is its observed p95 latency x CONNECTOR_DEADLINE_FACTOR,
+  clamped to [CONNECTOR_DEADLINE_MIN, CONNECTOR_DEADLINE_MAX];
+- connectors are ranked by mean relevant documents per run for the query class
+  and only the smallest set reaching SOURCE_TARGET_RECALL of the expected total
+  is run; each skipped one still runs with probability SOURCE_EXPLORE_RATE so
+  its stats keep up with the source (callers that need a repeatable schedule,
+  like refresh, pass explore=False).
+
+Connectors with fewer than CONNECTOR_MIN_SAMPLES observations always run with
+CONNECTOR_DEFAULT_DEADLINE. Only the last CONNECTOR_STATS_WINDOW samples per
+connector (and per query class for yields) are read, so older ones are deleted
+as new ones arrive and the database stays bounded.
+"""
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.config.settings import settings
+
+# Coarse query classes; a query belongs to the first class with a keyword hit
+QUERY_CLASSES = {
+    "developer": {"api", "sdk", "developer", "developers", "devops", "code", "coding", "github", "open", "source",
+                  "hackathon", "llm", "ai", "ml", "database", "infra", "infrastructure", "cli", "framework"},
+    "business": {"b2b", "saas", "enterprise", "sales", "crm", "invoice", "invoicing", "payroll", "restaurant",
+                 "retail", "logistics", "supply", "inventory", "smb", "compliance", "hr", "accounting"},
+    "consumer": {"students", "student", "parents", "people", "fitness", "dating", "travel", "food", "social",
+                 "gaming", "music", "personal", "habit", "mental", "health"},
+}
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_conn = None
+_lock = threading.Lock()
+_init_lock = threading.Lock()
+
+
+def query_class(query: str) -> str:
+    tokens = set(_TOKEN_RE.findall((query or "").lower()))
+    for name, keywords in QUERY_CLASSES.items():
+        if tokens & keywords:
+            return name
+    return "general"
+
+
+def _connect() -> Optional[sqlite3.Connection]:
+    global _conn
+    if _conn is not None:
+        return _conn
+    path = settings.CONNECTOR_STATS_DB
+    if not path:
+        return None
+    with _init_lock:
+        if _conn is not None:
+            return _conn
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("""CREATE TABLE IF NOT EXISTS fetches (
+            connector TEXT, query_class TEXT, at REAL, latency REAL, ok INTEGER, docs INTEGER)""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS yields (
+            connector TEXT, query_class TEXT, at REAL, retrieved INTEGER, kept INTEGER)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS fetches_recent ON fetches (connector, at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS yields_recent ON yields (connector, query_class, at)")
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+# --- Recording ---
+
+def record_fetch(connector: str, query: str, latency: float, ok: bool, docs: int) -> None:
+    conn = _connect()
+    if conn is None:
+        return
+    with _lock:
+        conn.execute(
+            "INSERT INTO fetches VALUES (?, ?, ?, ?, ?, ?)",
+            (connector, query_class(query), time.time(), latency, int(ok), docs),
+        )
+        # Everything older than the window's oldest sample (NULL, so nothing, until the window fills)
+        conn.execute(
+            "DELETE FROM fetches WHERE connector=? AND at < "
+            "(SELECT at FROM fetches WHERE connector=? ORDER BY at DESC LIMIT 1 OFFSET ?)",
+            (connector, connector, settings.CONNECTOR_STATS_WINDOW - 1),
+        )
+        conn.commit()
+
+
+def record_yield(query: str, retrieved: Dict[str, int], kept: Dict[str, int]) -> None:
+    """
+    Per-connector document counts before and after the relevance filter for one
+    search. `retrieved` should name every source the search ran, with 0 for
+    those that returned nothing, so a source that never yields is ranked (and
+    skipped) instead of staying unknown and running on every request.
+    """
+    conn = _connect()
+    if conn is None:
+        return
+    now = time.time()
+    cls = query_class(query)
+    with _lock:
+        conn.executemany(
+            "INSERT INTO yields VALUES (?, ?, ?, ?, ?)",
+            [(name, cls, now, count, kept.get(name, 0)) for name, count in retrieved.items()],
+        )
+        conn.executemany(
+            "DELETE FROM yields WHERE connector=? AND query_class=? AND at < "
+            "(SELECT at FROM yields WHERE connector=? AND query_class=? ORDER BY at DESC LIMIT 1 OFFSET ?)",
+            [(name, cls, name, cls, settings.CONNECTOR_STATS_WINDOW - 1) for name in retrieved],
+        )
+        conn.commit()
+
+
+# --- Stats ---
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def connector_stats(connector: str, query: str) -> Dict:
+    """
+    Recent history of `connector`: fetch count, p95 latency and error rate over
+    all queries (latency does not depend much on the query), and mean relevant
+    documents per run for this query's class.
+    """
+    conn = _connect()
+    window = settings.CONNECTOR_STATS_WINDOW
+    stats = {"fetches": 0, "p95_latency": None, "error_rate": None, "runs": 0, "mean_kept": None}
+    if conn is None:
+        return stats
+    with _lock:
+        fetches = conn.execute(
+            "SELECT latency, ok FROM fetches WHERE connector=? ORDER BY at DESC LIMIT ?", (connector, window)
+        ).fetchall()
+        yields = conn.execute(
+            "SELECT kept FROM yields WHERE connector=? AND query_class=? ORDER BY at DESC LIMIT ?",
+            (connector, query_class(query), window),
+        ).fetchall()
+    if fetches:
+        stats["fetches"] = len(fetches)
+        stats["p95_latency"] = _percentile([latency for latency, _ in fetches], 95)
+        stats["error_rate"] = sum(1 for _, ok in fetches if not ok) / len(fetches)
+    if yields:
+        stats["runs"] = len(yields)
+        stats["mean_kept"] = sum(kept for (kept,) in yields) / len(yields)
+    return stats
+
+
+# --- Scheduling ---
+
+def deadline(stats: Dict) -> float:
+    if stats["fetches"] < settings.CONNECTOR_MIN_SAMPLES:
+        return settings.CONNECTOR_DEFAULT_DEADLINE
+    seconds = stats["p95_latency"] * settings.CONNECTOR_DEADLINE_FACTOR
+    return min(max(seconds, settings.CONNECTOR_DEADLINE_MIN), settings.CONNECTOR_DEADLINE_MAX)
+
+
+def plan(names: List[str], query: str, explore: bool = True) -> Tuple[List[Tuple[str, float]], List[str]]:
+    """
+    ([(connector, deadline seconds)] to run, highest expected yield first;
+    [connectors skipped]) for this query. Without `explore` the schedule only
+    depends on the stats, never on chance.
+    """
+    stats = {name: connector_stats(name, query) for name in names}
+    known = [n for n in names if stats[n]["runs"] >= settings.CONNECTOR_MIN_SAMPLES]
+    unknown = [n for n in names if n not in known]
+
+    # Expected relevant docs, discounted by how often the source fails
+    def expected(name: str) -> float:
+        s = stats[name]
+        return (s["mean_kept"] or 0.0) * (1.0 - (s["error_rate"] or 0.0))
+
+    ranked = sorted(known, key=expected, reverse=True)
+    total = sum(expected(n) for n in ranked)
+    selected, skipped, covered = [], [], 0.0
+    for name in ranked:
+        exploring = explore and random.random() < settings.SOURCE_EXPLORE_RATE
+        if total > 0 and covered >= settings.SOURCE_TARGET_RECALL * total and not exploring:
+            skipped.append(name)
+            continue
+        selected.append(name)
+        covered += expected(name)
+
+    return [(name, deadline(stats[name])) for name in selected + unknown], skipped
+
+
+def schedule(names: List[str], query: str) -> List[Tuple[str, float]]:
+    """[(connector, deadline seconds)] for running exactly `names`, none skipped."""
+    return [(name, deadline(connector_stats(name, query))) for name in names]
@@ -0,0 +1,95 @@
+"""
+Searchable history of past analyses.
+
+Every finished report (its query and SynthOutput) and the connector documents
+gathered for it are embedded and appended to a persistent VectorIndex at
+VECTOR_INDEX_PATH. The master graph looks up the nearest past reports for a new
+query and passes them on as context, or reuses them instead of a fresh web
+search when they are near-identical (HISTORY_SHORTCUT_SCORE).
+"""
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+from app.config.settings import settings
+from app.tools import relevance
+from app.tools.result_store import doc_key, query_key
+from app.utils.vector_index import VectorIndex
+
+REPORT = 1
+DOCUMENT = 2
+SNIPPET_CHARS = 500
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _embed(texts: List[str]):
+    return relevance.embed_stable(texts, settings.VECTOR_INDEX_DIM)
+
+
+def _get_index(dim: int) -> Optional[VectorIndex]:
+    global _index
+    if _index is None and settings.VECTOR_INDEX_PATH:
+        with _index_lock:
+            if _index is None:
+                _index = VectorIndex(settings.VECTOR_INDEX_PATH, dim)
+    return _index
+
+
+def add_report(query: str, output: Dict) -> None:
+    """Index a finished SynthOutput (as a dict) under its query."""
+    if not settings.VECTOR_INDEX_PATH:
+        return
+    summary = output.get("final_summary") or ""
+    vectors = _embed([f"{query} {summary}"])
+    payload = {
+        "query": query,
+        "final_summary": summary[:SNIPPET_CHARS * 4],
+        "recommendations": str(output.get("recommendations") or "")[:SNIPPET_CHARS * 2],
+        "created_at": time.time(),
+    }
+    # One entry per query and summary, so re-running an unchanged report adds nothing
+    key = f"{query_key(query)}|{zlib.crc32(summary.encode())}"
+    _get_index(vectors.shape[1]).add(vectors, [payload], kind=REPORT, keys=[key])
+
+
+def add_documents(query: str, docs: List[Dict]) -> None:
+    """Index connector documents; documents already indexed (same url) are skipped."""
+    if not settings.VECTOR_INDEX_PATH or not docs:
+        return
+    vectors = _embed([relevance.document_text(d) for d in docs])
+    payloads = [
+        {
+            "query": query,
+            "source": d.get("source"),
+            "title": d.get("name") or d.get("title"),
+            "url": d.get("url"),
+            "snippet": relevance.document_text(d)[:SNIPPET_CHARS],
+        }
+        for d in docs
+    ]
+    _get_index(vectors.shape[1]).add(vectors, payloads, kind=DOCUMENT, keys=[doc_key(d) for d in docs])
+
+
+def _related(query: str, kind: int, k: Optional[int], min_score: Optional[float]) -> List[Dict]:
+    if not settings.VECTOR_INDEX_PATH:
+        return []
+    vector = _embed([query])[0]
+    index = _get_index(len(vector))
+    if not len(index):
+        return []
+    k = settings.HISTORY_TOP_K if k is None else k
+    min_score = settings.HISTORY_MIN_SCORE if min_score is None else min_score
+    return [dict(hit["payload"], score=hit["score"]) for hit in index.search(vector, k, kind=kind, min_score=min_score)]
+
+
+def related_reports(query: str, k: Optional[int] = None, min_score: Optional[float] = None) -> List[Dict]:
+    """Past reports closest to `query`, best first, each with its "score"."""
+    return _related(query, REPORT, k, min_score)
+
+
+def related_documents(query: str, k: Optional[int] = None, min_score: Optional[float] = None) -> List[Dict]:
+    """Previously gathered documents closest to `query`, best first."""
+    return _related(query, DOCUMENT, k, min_score)
@@ -0,0 +1,77 @@
+import json
+from app.bench import recorder
+
+
+class RecordedResponse:
+    """
+    Minimal stand-in for requests.Response when a cassette is replayed or a
+    body was read with a size cap.
+    """
+    def __init__(self, status_code: int, text: str, headers: dict | None = None, truncated: bool = False):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.truncated = truncated
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def _dump(resp) -> dict:
+    return {
+        "status_code": resp.status_code,
+        "text": resp.text,
+        "headers": {"Content-Type": resp.headers.get("Content-Type", "")},
+    }
+
+
+def _load(data: dict) -> RecordedResponse:
+    return RecordedResponse(data["status_code"], data["text"], data.get("headers"))
+
+
+def _capped_request(method: str, url: str, max_bytes: int, **kwargs) -> RecordedResponse:
+    """Stream the body and stop after max_bytes, so a huge page never sits in memory whole."""
+    import requests
+
+    chunks, size, truncated = [], 0, False
+    with requests.request(method, url, stream=True, **kwargs) as resp:
+        for chunk in resp.iter_content(chunk_size=64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                truncated = True
+                break
+        body = b"".join(chunks)[:max_bytes]
+        text = body.decode(resp.encoding or "utf-8", errors="replace")
+        return RecordedResponse(
+            resp.status_code, text, {"Content-Type": resp.headers.get("Content-Type", "")}, truncated
+        )
+
+
+def request(method: str, url: str, max_bytes: int | None = None, **kwargs):
+    """
+    Shared HTTP entry point for connectors, so record/replay (app.bench.recorder)
+    sees every outbound call. With `max_bytes` the body is streamed and cut off
+    at that size (the response's `truncated` flag says whether it was).
+    """
+    key = {"method": method, "url": url, "params": kwargs.get("params"), "json": kwargs.get("json")}
+    if max_bytes:
+        live = lambda: _capped_request(method, url, max_bytes, **kwargs)
+    else:
+        def live():
+            # Imported on first request, not when the pipeline is imported
+            import requests
+            return requests.request(method, url, **kwargs)
+    return recorder.intercept("http", key, live, dump=_dump, load=_load)
+
+
+def get(url: str, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs):
+    return request("POST", url, **kwargs)
@@ -6,6 +6,7 @@ from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, Tabl
 from reportlab.lib import colors
 from datetime import datetime
 import os
+from app.utils import profiling, tracing
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 
@@ -29,6 +30,8 @@ def load_document_file(file_name: str):
 
 
 
+@tracing.traced("pdf.render")
+@profiling.profiled("pdf.render")
 def generate_briefing_pdf(summary: str, takeaways: str, table: str):
     """Generate a professionally formatted briefing PDF."""
     
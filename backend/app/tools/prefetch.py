@@ -0,0 +1,100 @@
+"""
+Speculative connector prefetch.
+
+With SPECULATIVE_PREFETCH on, router_node starts search_all for the user query
+in the background while its routing LLM call is in flight. Web intel then
+`take`s the job's prefetch and uses its documents only when its tool call asks
+for the same query and limit (typically short, keyword-like user queries that
+the model passes through unchanged); otherwise the prefetch is cancelled and
+web intel searches for the tool call's keywords, so turning prefetch on never
+changes what is retrieved. If the router skips web intel the prefetch is
+cancelled too: queued connectors are skipped and running ones stop at their
+next check (see search_all). Prefetches are registered per job id.
+"""
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from app.tools.web_tools import plan_sources, search_all
+
+# Same default the web intel tool call uses when the model gives no limit
+DEFAULT_LIMIT = 6
+
+
+class CancelToken:
+    """Cooperative cancellation flag checked by search_all and the connectors it runs."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+_registry: Dict[str, "Prefetch"] = {}
+_registry_lock = threading.Lock()
+
+
+class Prefetch:
+    def __init__(self, query: str, limit: int, types: Optional[List[str]]):
+        self.query = query
+        self.limit = limit
+        self.types = types
+        self.token = CancelToken()
+        self.sources: List[str] = []
+        # Run in the caller's context so the connector spans join the current trace
+        ctx = contextvars.copy_context()
+        self.future: Future = _executor.submit(ctx.run, self._search)
+
+    def _search(self) -> List[Dict]:
+        # Planned here so web intel can record which sources the documents came from
+        self.sources = plan_sources(self.query)
+        return search_all(self.query, self.limit, self.types, self.token, sources=self.sources)
+
+    def cancel(self) -> None:
+        self.token.cancel()
+
+    def result(self) -> Optional[List[Dict]]:
+        """The prefetched documents (waiting for them if needed), or None if cancelled or failed."""
+        if self.token.cancelled:
+            return None
+        try:
+            return self.future.result()
+        except Exception as e:
+            print(f"Prefetch failed: {e}")
+            return None
+
+
+def start(job_id: str, query: str, limit: int = DEFAULT_LIMIT, types: Optional[List[str]] = None) -> Prefetch:
+    """Begin fetching connectors for `query` under `job_id` (replacing an earlier prefetch)."""
+    prefetch = Prefetch(query, limit, types)
+    with _registry_lock:
+        previous = _registry.pop(job_id, None)
+        _registry[job_id] = prefetch
+    if previous is not None:
+        previous.cancel()
+    return prefetch
+
+
+def get(job_id: str) -> Optional[Prefetch]:
+    with _registry_lock:
+        return _registry.get(job_id)
+
+
+def take(job_id: str) -> Optional[Prefetch]:
+    """Remove and return the job's prefetch for its consumer (web intel)."""
+    with _registry_lock:
+        return _registry.pop(job_id, None)
+
+
+def cancel(job_id: str) -> None:
+    """Stop the job's prefetch; connectors still running stop and keep nothing they fetched."""
+    prefetch = take(job_id)
+    if prefetch is not None:
+        prefetch.cancel()
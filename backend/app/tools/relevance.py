@@ -0,0 +1,148 @@
+"""
+Local relevance scoring of connector documents against the user query.
+
+Runs on CPU before synthesize_summary so documents that only matched on a
+stray keyword (top Product Hunt posts, loosely matched YC cards) are not sent
+to the LLM. The default embedder is a hashed TF-IDF over the query + documents
+of the request; setting RELEVANCE_MODEL to a sentence-transformers model name
+(optional extra: `pip install sentence-transformers`) uses dense embeddings
+instead. Scores are cosine similarities computed in one NumPy matrix product.
+NumPy is imported on first use so importing the pipeline stays cheap.
+"""
+import math
+import re
+import threading
+import zlib
+from typing import TYPE_CHECKING, Dict, List
+
+from app.config.settings import settings
+
+HASH_DIM = 4096
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have i in is it its of on or that the this to was we what with you your".split()
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def document_text(doc: Dict) -> str:
+    parts = [
+        doc.get("name"), doc.get("title"), doc.get("description"), doc.get("pitch"),
+        doc.get("tagline"), doc.get("snippet"),
+    ]
+    for key in ("tags", "tech_stack", "matches"):
+        value = doc.get(key)
+        if isinstance(value, list):
+            parts.extend(str(v) for v in value)
+    return " ".join(p for p in parts if p)
+
+
+def _tokens(text: str) -> List[str]:
+    words = [w for w in _TOKEN_RE.findall(text.lower()) if w not in _STOPWORDS]
+    # unigrams plus bigrams so "queue management" scores above two unrelated hits
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+def _hashed_tf(texts: List[str], dim: int) -> "np.ndarray":
+    import numpy as np
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for token in _tokens(text):
+            matrix[row, zlib.crc32(token.encode()) % dim] += 1.0
+    return np.log1p(matrix, out=matrix)
+
+
+def _normalize(matrix: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _hashed_tfidf(texts: List[str]) -> "np.ndarray":
+    """Rows are L2-normalised sublinear-TF x IDF vectors; IDF comes from this request's texts."""
+    import numpy as np
+    matrix = _hashed_tf(texts, HASH_DIM)
+    df = np.count_nonzero(matrix, axis=0)
+    idf = np.log((1 + len(texts)) / (1 + df)).astype(np.float32) + 1.0
+    matrix *= idf
+    return _normalize(matrix)
+
+
+def _dense_embed(texts: List[str]):
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError:
+                    print("Warning: sentence-transformers not installed; using hashed TF-IDF relevance.")
+                    _model = False
+                else:
+                    _model = SentenceTransformer(settings.RELEVANCE_MODEL, device="cpu")
+    if not _model:
+        return None
+    import numpy as np
+    return np.asarray(_model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+
+def embed(texts: List[str]) -> "np.ndarray":
+    """L2-normalised vectors for `texts` using the configured embedder."""
+    if settings.RELEVANCE_MODEL:
+        vectors = _dense_embed(texts)
+        if vectors is not None:
+            return vectors
+    return _hashed_tfidf(texts)
+
+
+def embed_stable(texts: List[str], dim: int) -> "np.ndarray":
+    """
+    Vectors comparable across requests, for persistent indexes: the dense model
+    when configured, else hashed sublinear TF without the per-request IDF.
+    """
+    if settings.RELEVANCE_MODEL:
+        vectors = _dense_embed(texts)
+        if vectors is not None:
+            return vectors
+    return _normalize(_hashed_tf(texts, dim))
+
+
+def score_documents(query: str, docs: List[Dict]) -> "np.ndarray":
+    """Cosine similarity of each document to the query."""
+    import numpy as np
+    if not docs:
+        return np.zeros(0, dtype=np.float32)
+    vectors = embed([query] + [document_text(d) for d in docs])
+    return vectors[1:] @ vectors[0]
+
+
+def filter_relevant(query: str, docs: List[Dict], threshold: float | None = None,
+                    min_keep: int | None = None) -> List[Dict]:
+    """
+    Drop documents scoring below `threshold` (RELEVANCE_THRESHOLD), keeping at
+    least the `min_keep` (RELEVANCE_MIN_KEEP) best. Kept documents carry their
+    score under "relevance" and stay in their original order.
+    """
+    if not docs:
+        return docs
+    threshold = settings.RELEVANCE_THRESHOLD if threshold is None else threshold
+    min_keep = settings.RELEVANCE_MIN_KEEP if min_keep is None else min_keep
+
+    import numpy as np
+
+    scores = score_documents(query, docs)
+    keep = scores >= threshold
+    if keep.sum() < min(min_keep, len(docs)):
+        keep[np.argsort(-scores)[:min_keep]] = True
+
+    return [
+        dict(doc, relevance=round(float(score), 4))
+        for doc, score, kept in zip(docs, scores, keep)
+        if kept and not math.isnan(score)
+    ]
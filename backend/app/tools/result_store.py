@@ -0,0 +1,150 @@
+"""
+Persistent store of connector results and finished reports (SQLite, zlib-compressed JSON).
+
+search_all reads a source's stored result while it is younger than that
+source's TTL, so re-runs and refreshes only hit the network for stale sources.
+Reports are stored per user query together with the search parameters and
+document keys they were built from, which is what refresh_master_agent diffs against.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+from app.config.settings import settings
+
+_conn = None
+_lock = threading.Lock()
+_init_lock = threading.Lock()
+
+
+def _connect() -> Optional[sqlite3.Connection]:
+    global _conn
+    if _conn is not None:
+        return _conn
+    path = settings.RESULTS_DB
+    if not path:
+        return None
+    with _init_lock:
+        if _conn is not None:
+            return _conn
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("""CREATE TABLE IF NOT EXISTS connector_results (
+            source TEXT, query_key TEXT, max_items INTEGER, fetched_at REAL, docs BLOB,
+            PRIMARY KEY (source, query_key, max_items))""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS reports (
+            query_key TEXT PRIMARY KEY, query TEXT, search_params TEXT, created_at REAL,
+            refreshed_at REAL, doc_keys TEXT, output BLOB)""")
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def _pack(obj) -> bytes:
+    return zlib.compress(json.dumps(obj).encode("utf-8"))
+
+
+def _unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def query_key(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def doc_key(doc: Dict) -> str:
+    return doc.get("url") or f"{doc.get('source')}:{doc.get('name') or doc.get('title')}"
+
+
+def source_ttl(source: str) -> float:
+    """Per-source freshness window from SOURCE_TTLS ("yc=86400,reddit=3600"), else CONNECTOR_CACHE_TTL."""
+    for part in (settings.SOURCE_TTLS or "").split(","):
+        name, _, seconds = part.partition("=")
+        if name.strip() == source and seconds:
+            return float(seconds)
+    return float(settings.CONNECTOR_CACHE_TTL)
+
+
+# --- Connector results ---
+
+def load_results(source: str, query: str, limit: int, max_age: Optional[float] = None):
+    """Stored docs and their fetch time, or None when missing or older than max_age."""
+    conn = _connect()
+    if conn is None:
+        return None
+    with _lock:
+        row = conn.execute(
+            "SELECT fetched_at, docs FROM connector_results WHERE source=? AND query_key=? AND max_items=?",
+            (source, query_key(query), limit),
+        ).fetchone()
+    if row is None:
+        return None
+    fetched_at, blob = row
+    if max_age is not None and time.time() - fetched_at > max_age:
+        return None
+    return {"fetched_at": fetched_at, "docs": _unpack(blob)}
+
+
+def save_results(source: str, query: str, limit: int, docs: List[Dict]) -> None:
+    conn = _connect()
+    if conn is None:
+        return
+    with _lock:
+        conn.execute(
+            "INSERT OR REPLACE INTO connector_results VALUES (?, ?, ?, ?, ?)",
+            (source, query_key(query), limit, time.time(), _pack(docs)),
+        )
+        conn.commit()
+
+
+# --- Reports ---
+
+def load_report(query: str) -> Optional[Dict]:
+    conn = _connect()
+    if conn is None:
+        return None
+    with _lock:
+        row = conn.execute(
+            "SELECT query, search_params, created_at, refreshed_at, doc_keys, output FROM reports WHERE query_key=?",
+            (query_key(query),),
+        ).fetchone()
+    if row is None:
+        return None
+    q, search_params, created_at, refreshed_at, doc_keys, output = row
+    return {
+        "query": q,
+        "search": json.loads(search_params) if search_params else None,
+        "created_at": created_at,
+        "refreshed_at": refreshed_at,
+        "doc_keys": json.loads(doc_keys),
+        "output": _unpack(output),
+    }
+
+
+def save_report(query: str, output: Dict, search: Optional[Dict], doc_keys: List[str]) -> None:
+    """`search` holds the search_all arguments ({"query", "limit", "types", "sources"}) the report was built from."""
+    conn = _connect()
+    if conn is None:
+        return
+    now = time.time()
+    with _lock:
+        conn.execute(
+            "INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (query_key(query), query, json.dumps(search) if search else None, now, now, json.dumps(doc_keys), _pack(output)),
+        )
+        conn.commit()
+
+
+def touch_report(query: str) -> None:
+    conn = _connect()
+    if conn is None:
+        return
+    with _lock:
+        conn.execute("UPDATE reports SET refreshed_at=? WHERE query_key=?", (time.time(), query_key(query)))
+        conn.commit()
@@ -1,13 +1,20 @@
-from supabase import create_client
 from app.config.settings import settings
 
-url = settings.SUPABASE_URL
-key = settings.SUPABASE_KEY
-supabase = create_client(url, key)
+_supabase = None
+
+
+def get_supabase():
+    """Create the Supabase client on first use instead of at import time."""
+    global _supabase
+    if _supabase is None:
+        from supabase import create_client
+        _supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+    return _supabase
+
 
 def run_query(sql: str):
     try:
-        result = supabase.rpc("exec_sql", {"query": sql}).execute()
+        result = get_supabase().rpc("exec_sql", {"query": sql}).execute()
         return result.data
     except Exception as e:
         return {"error": str(e)}
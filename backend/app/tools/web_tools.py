@@ -1,28 +1,69 @@
+import contextvars
 import json
+import os
+import re
 import time
-import requests
 import threading  # <--- NEW IMPORT: Needed to fix the error
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timezone
 from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
+from app.bench import recorder
 from app.config.settings import settings
+from app.tools import connector_stats, http_client, result_store
+from app.utils import job_queue, metrics, profiling, tracing
+from app.utils.cache import TTLCache
 
 # Configuration constants
-PH_API_TOKEN = settings.PH_API_TOKEN  
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 
 class BaseConnector(ABC):
+    name = "base"
+    # The "source" value on this connector's documents
+    source_label = ""
+    # Worker pool that runs this connector in distributed mode
+    topic = "http"
+
     @abstractmethod
     def fetch_signals(self, query: str, limit: int = 5) -> List:
         pass
 
+# How long to wait for the YC list to render / grow after a scroll (ms)
+YC_SCROLL_TIMEOUT_MS = 5000
+
+# Extracts every company card not returned before and tags it, so each scroll
+# only ships the newly loaded cards back to Python
+_YC_EXTRACT_NEW_CARDS_JS = """
+() => {
+  let cards = document.querySelectorAll('a._company_86jzd_338:not([data-extracted])');
+  if (!cards.length) cards = document.querySelectorAll('a[href^="/companies/"]:not([data-extracted])');
+  const text = (card, selector) => {
+    const el = card.querySelector(selector);
+    return el ? el.textContent.trim() : null;
+  };
+  return Array.from(cards, card => {
+    card.setAttribute('data-extracted', '1');
+    return {
+      name: text(card, '.coName'),
+      description: text(card, '.coDescription'),
+      batch: text(card, '.coBatch'),
+      href: card.getAttribute('href'),
+    };
+  });
+}
+"""
+
+
 class YCombinatorConnector(BaseConnector):
     """
     Implements the 'Scroll and Wait' pattern to harvest YC Company data.
     FIXED: Now wraps the synchronous Playwright code in a separate thread 
     to avoid crashing the main AsyncIO event loop.
     """
+    name = "yc"
+    source_label = "Y Combinator"
+    topic = "browser"
+
     def fetch_signals(self, query: str, limit: int = 10) -> List:
         results = []
         error = None
@@ -31,59 +72,55 @@ class YCombinatorConnector(BaseConnector):
         def run_scrape():
             nonlocal results, error
             try:
+                from playwright.sync_api import TimeoutError as PlaywrightTimeoutError, sync_playwright
                 with sync_playwright() as p:
-                    browser = p.chromium.launch(headless=True,slow_mo=1000)
+                    browser = p.chromium.launch(headless=True)
                     page = browser.new_page(user_agent=USER_AGENT)
                     
                     url = f"https://www.ycombinator.com/companies?q={query}"
                     print(f"DEBUG: Scraping YC URL: {url}")
                     page.goto(url)
+                    try:
+                        page.wait_for_selector('a[href^="/companies/"]', timeout=YC_SCROLL_TIMEOUT_MS)
+                    except PlaywrightTimeoutError:
+                        pass
                     
-                    # Infinite Scroll Logic
-                    previous_height = 0
+                    # Infinite Scroll Logic: one round trip per scroll, returning only cards
+                    # not extracted before, until `limit` unique companies are collected
+                    seen = set()
                     while len(results) < limit:
-                        # Extract cards currently in DOM
-                        company_cards = page.locator('a._company_86jzd_338').all()
-                        
-                        if not company_cards:
-                            company_cards = page.locator('a[href^="/companies/"]').all()
-
-                        for card in company_cards:
-                            if len(results) >= limit: 
-                                break
-                            
-                            try:
-                                name = card.locator('.coName').first.text_content()
-                                desc = card.locator('.coDescription').first.text_content()
-                                # Safe check for batch
-                                if card.locator('.coBatch').count() > 0:
-                                    batch = card.locator('.coBatch').first.text_content()
-                                else:
-                                    batch = "Unknown"
-                                
-                                # Deduping check
-                                if not any(r['name'] == name for r in results):
-                                    results.append({
-                                        "source": "Y Combinator",
-                                        "type": "supply_signal",
-                                        "name": name,
-                                        "description": desc,
-                                        "batch": batch,
-                                        "url": f"https://www.ycombinator.com{card.get_attribute('href')}"
-                                    })
-                            except Exception:
+                        check_cancelled()
+                        for card in page.evaluate(_YC_EXTRACT_NEW_CARDS_JS):
+                            name = card.get("name")
+                            if not name or name in seen:
                                 continue
+                            seen.add(name)
+                            results.append({
+                                "source": "Y Combinator",
+                                "type": "supply_signal",
+                                "name": name,
+                                "description": card.get("description"),
+                                "batch": card.get("batch") or "Unknown",
+                                "url": f"https://www.ycombinator.com{card.get('href')}"
+                            })
+                            if len(results) >= limit:
+                                break
+                        if len(results) >= limit:
+                            break
 
-                        # Scroll down
+                        # Scroll down and wait only as long as it takes new content to load
+                        height = page.evaluate("document.body.scrollHeight")
                         page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                        page.wait_for_timeout(2000) 
-                        
-                        new_height = page.evaluate("document.body.scrollHeight")
-                        if new_height == previous_height:
-                            break 
-                        previous_height = new_height
+                        try:
+                            page.wait_for_function(
+                                "h => document.body.scrollHeight > h", arg=height, timeout=YC_SCROLL_TIMEOUT_MS
+                            )
+                        except PlaywrightTimeoutError:
+                            break  # nothing more to load
                     
                     browser.close()
+            except FetchCancelled:
+                pass  # search_all sees the token and discards these results
             except Exception as e:
                 error = e
         # -------------------------------------------------------------------
@@ -91,12 +128,18 @@ class YCombinatorConnector(BaseConnector):
         # --- THE FIX: Run the scraper in a separate thread ---
         # This tricks Python into thinking the scraping is happening "elsewhere",
         # so it doesn't block the main Async Event Loop.
-        t = threading.Thread(target=run_scrape)
-        t.start()
-        t.join()  # We wait here for the thread to finish
+        def scrape_in_thread():
+            # Context copy so the scrape sees the search's cancel token
+            t = threading.Thread(target=contextvars.copy_context().run, args=(run_scrape,))
+            t.start()
+            t.join()  # We wait here for the thread to finish
+            return results
+
+        results = recorder.intercept("browser", {"connector": self.name, "query": query, "limit": limit}, scrape_in_thread)
         
         if error:
             print(f"Error scraping YC: {error}")
+            metrics.connector_errors.inc(connector=self.name)
             return []
 
         return results
@@ -105,8 +148,12 @@ class ProductHuntConnector(BaseConnector):
     """
     Implements GraphQL v2 API to fetch high-velocity launches.
     """
+    name = "ph"
+    source_label = "Product Hunt"
+
     def fetch_signals(self, query: str, limit: int = 5) -> List:
         # Check if token is missing or default
+        PH_API_TOKEN = settings.PH_API_TOKEN
         if not PH_API_TOKEN or PH_API_TOKEN == "YOUR_PRODUCT_HUNT_DEVELOPER_TOKEN":
             print("Warning: Product Hunt API Token missing.")
             return []
@@ -139,9 +186,10 @@ class ProductHuntConnector(BaseConnector):
         """ % limit
 
         try:
-            response = requests.post(url, json={'query': graphql_query}, headers=headers)
+            response = http_client.post(url, json={'query': graphql_query}, headers=headers)
             if response.status_code != 200:
                 print(f"Product Hunt API Error: {response.status_code}")
+                metrics.connector_errors.inc(connector=self.name)
                 return []
 
             data = response.json().get('data', {}).get('posts', {}).get('edges', [])
@@ -162,29 +210,43 @@ class ProductHuntConnector(BaseConnector):
             return normalized
         except Exception as e:
             print(f"Product Hunt connection failed: {e}")
+            metrics.connector_errors.inc(connector=self.name)
             return []
 
 class DevpostConnector(BaseConnector):
     """
     Scrapes 'Built With' tags to identify Technical Momentum.
     """
+    name = "devpost"
+    source_label = "Devpost"
+
     def fetch_signals(self, query: str, limit: int = 5) -> List:
+        from bs4 import BeautifulSoup, SoupStrainer
+
+        # Only the subtrees the selectors below need are built; bodies are read with a size cap
+        links_only = SoupStrainer("a", class_="link-to-software")
+        title_and_stack = SoupStrainer(id=["app-title", "built-with"])
+        tagline_only = SoupStrainer(attrs={"class": lambda c: c is not None and "mb-4" in c})
+
         search_url = f"https://devpost.com/software/search?query={query}"
         try:
-            resp = requests.get(search_url, headers={'User-Agent': USER_AGENT})
-            soup = BeautifulSoup(resp.text, 'html.parser')
+            resp = http_client.get(search_url, headers={'User-Agent': USER_AGENT}, max_bytes=settings.HTTP_MAX_BYTES)
+            soup = BeautifulSoup(resp.text, 'html.parser', parse_only=links_only)
             
             projects = []
             # Selector might need maintenance as Devpost updates UI
             project_links = [a['href'] for a in soup.select('.link-to-software')][:limit]
+            del resp, soup
             
             for link in project_links:
+                check_cancelled()
                 try:
-                    p_resp = requests.get(link, headers={'User-Agent': USER_AGENT})
-                    p_soup = BeautifulSoup(p_resp.text, 'html.parser')
+                    p_resp = http_client.get(link, headers={'User-Agent': USER_AGENT}, max_bytes=settings.HTTP_MAX_BYTES)
+                    p_soup = BeautifulSoup(p_resp.text, 'html.parser', parse_only=title_and_stack)
+                    t_soup = BeautifulSoup(p_resp.text, 'html.parser', parse_only=tagline_only)
                     
                     title = p_soup.select_one('#app-title').text.strip() if p_soup.select_one('#app-title') else "Unknown"
-                    tagline = p_soup.select_one('.large.mb-4').text.strip() if p_soup.select_one('.large.mb-4') else ""
+                    tagline = t_soup.select_one('.large.mb-4').text.strip() if t_soup.select_one('.large.mb-4') else ""
                     
                     built_with = [li.text.strip() for li in p_soup.select('#built-with li')]
                     
@@ -199,22 +261,149 @@ class DevpostConnector(BaseConnector):
                 except Exception:
                     continue
             return projects
+        except FetchCancelled:
+            raise
         except Exception as e:
             print(f"Devpost scraping failed: {e}")
+            metrics.connector_errors.inc(connector=self.name)
             return []
 
-class RedditDorkGenerator(BaseConnector):
+class RedditConnector(BaseConnector):
     """
-    Generates 'Google Dork' URLs for high-intent social listening.
+    Collects real pain-point evidence from Reddit's public JSON search listings.
+    Several high-intent phrasings of the query are fetched concurrently, posts are
+    deduped across variants and only the sentences that match the query are kept.
     """
+    name = "reddit"
+    source_label = "Reddit"
+    SEARCH_URL = "https://www.reddit.com/search.json"
+    INTENT_PHRASES = ["I hate doing", "alternative to", "willing to pay", "why isn't there a"]
+    MAX_MATCHES = 3
+
+    _cache = TTLCache()
+
+    def _variants(self, query: str) -> List[str]:
+        return [query] + [f'{query} "{phrase}"' for phrase in self.INTENT_PHRASES]
+
+    def _load_fixture(self, variant: str) -> Dict:
+        name = re.sub(r"[^a-z0-9]+", "_", variant.lower()).strip("_") + ".json"
+        path = os.path.join(settings.REDDIT_FIXTURES_PATH, name)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _fetch_listing(self, variant: str, limit: int) -> List[Dict]:
+        cache_key = (variant, limit)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if settings.REDDIT_FIXTURES_PATH:
+            listing = self._load_fixture(variant)
+        else:
+            resp = http_client.get(
+                self.SEARCH_URL,
+                params={"q": variant, "limit": limit, "sort": "relevance", "t": "year"},
+                headers={"User-Agent": USER_AGENT},
+                timeout=10
+            )
+            if resp.status_code != 200:
+                print(f"Reddit API Error: {resp.status_code}")
+                metrics.connector_errors.inc(connector=self.name)
+                return []
+            listing = resp.json()
+
+        posts = [child.get("data", {}) for child in listing.get("data", {}).get("children", [])]
+        self._cache.set(cache_key, posts, ttl=settings.CONNECTOR_CACHE_TTL)
+        return posts
+
+    def _extract_matches(self, text: str, terms: List[str]) -> List[str]:
+        matches = []
+        for sentence in re.split(r'(?<=[.!?])\s+|\n+', text):
+            sentence = sentence.strip()
+            lowered = sentence.lower()
+            if sentence and any(term in lowered for term in terms):
+                matches.append(sentence[:300])
+                if len(matches) >= self.MAX_MATCHES:
+                    break
+        return matches
+
     def fetch_signals(self, query: str, limit: int = 5) -> List:
-        dorks = [
-            {"source": "Reddit", "type": "social_signal", "dork": f'site:reddit.com "{query}" "I hate doing"'},
-            {"source": "Reddit", "type": "social_signal", "dork": f'site:reddit.com "{query}" "alternative to"'},
-            {"source": "Reddit", "type": "social_signal", "dork": f'site:reddit.com "{query}" "willing to pay"'},
-            {"source": "Reddit", "type": "social_signal", "dork": f'site:reddit.com "{query}" "why isn\'t there a"'},
-        ]
-        return dorks
+        variants = self._variants(query)
+        listings = []
+        with ThreadPoolExecutor(max_workers=len(variants)) as pool:
+            # Copied contexts carry the cancel token and the active cassette into the pool
+            futures = [pool.submit(contextvars.copy_context().run, self._fetch_listing, v, limit) for v in variants]
+            for future in futures:
+                try:
+                    listings.append(future.result())
+                except Exception as e:
+                    print(f"Reddit fetch failed: {e}")
+                    metrics.connector_errors.inc(connector=self.name)
+
+        terms = [t for t in re.findall(r"\w+", query.lower()) if len(t) > 2]
+        terms += [phrase.lower() for phrase in self.INTENT_PHRASES]
+
+        seen = set()
+        signals = []
+        for posts in listings:
+            for post in posts:
+                post_id = post.get("name") or post.get("id")
+                if not post_id or post_id in seen:
+                    continue
+                seen.add(post_id)
+
+                title = post.get("title", "")
+                body = post.get("selftext", "")
+                matches = self._extract_matches(f"{title}\n{body}", terms)
+                if not matches:
+                    continue
+
+                created = post.get("created_utc")
+                signals.append({
+                    "source": "Reddit",
+                    "type": "social_signal",
+                    "name": title,
+                    "title": title,
+                    "snippet": matches[0],
+                    "matches": matches,
+                    # Long self-posts are cut so documents stay small in caches and run state
+                    "full_text": body[:settings.FULL_TEXT_INLINE_CHARS],
+                    "subreddit": post.get("subreddit"),
+                    "score": post.get("score", 0),
+                    "num_comments": post.get("num_comments", 0),
+                    "date": datetime.fromtimestamp(created, tz=timezone.utc).date().isoformat() if created else None,
+                    "url": f"https://www.reddit.com{post.get('permalink', '')}"
+                })
+
+        # Posts hitting more query terms / intent phrases carry the strongest signal
+        signals.sort(key=lambda s: (len(s["matches"]), s["score"]), reverse=True)
+        return signals[:limit]
+
+# Kept for callers still importing the old name
+RedditDorkGenerator = RedditConnector
+
+# Results shared by every search_all caller (including whole batches); identical
+# in-flight fetches are merged into one
+_results_cache = TTLCache(maxsize=1024)
+
+def connector_for_doc(doc: Dict) -> Optional[str]:
+    """Registry name of the connector a document came from."""
+    for name, connector in CONNECTORS.items():
+        if connector.source_label == doc.get("source"):
+            return name
+    return None
+
+
+# Runs search_all's connector fetches; not a with-block pool, so a connector past
+# its deadline can finish in the background without holding up the caller
+_connector_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="connector")
+
+# Connector registry, in fan-out order: YC (thread-safe), Product Hunt, Devpost, Reddit
+CONNECTORS: Dict[str, BaseConnector] = {
+    c.name: c for c in (YCombinatorConnector(), ProductHuntConnector(), DevpostConnector(), RedditConnector())
+}
 
 def market_intel_search(query: str, sources: List[str] = ["yc", "ph", "devpost", "reddit"]):
     """
@@ -229,27 +418,202 @@ def market_intel_search(query: str, sources: List[str] = ["yc", "ph", "devpost",
     if "devpost" in sources:
         aggregator.extend(DevpostConnector().fetch_signals(query))
     if "reddit" in sources:
-        aggregator.extend(RedditDorkGenerator().fetch_signals(query))
+        aggregator.extend(RedditConnector().fetch_signals(query))
         
     return json.dumps(aggregator, indent=2)
 
-def search_all(query: str, limit: int = 5, types: Optional[List[str]] = None) -> List[Dict]:
+def _fetch_signals(name: str, connector: BaseConnector, query: str, limit: int) -> List[Dict]:
+    """Run the connector here, or on a worker for its topic in distributed mode."""
+    if not job_queue.distributed():
+        return connector.fetch_signals(query, limit=limit)
+    return job_queue.run_remote(
+        connector.topic,
+        {"kind": "connector", "connector": name, "query": query, "limit": limit},
+        fallback=lambda: connector.fetch_signals(query, limit=limit),
+        job_id=job_queue.current_job_id.get(),
+    )
+
+
+class FetchCancelled(Exception):
+    """The search a connector fetch was running for has been cancelled."""
+
+
+# Cancel token of the search_all call the current connector fetch belongs to
+_cancel_token: contextvars.ContextVar = contextvars.ContextVar("connector_cancel_token", default=None)
+
+
+class _ConnectorToken:
+    """
+    Cancel token of one connector task in a search: cancelled with the search
+    (`parent`) or on its own once the task misses its deadline (`expire`).
+    """
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self._expired = threading.Event()
+
+    def expire(self) -> None:
+        self._expired.set()
+
+    @property
+    def expired(self) -> bool:
+        return self._expired.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.expired or (self.parent is not None and self.parent.cancelled)
+
+
+def check_cancelled() -> None:
+    """Raise FetchCancelled once the running fetch's search is cancelled; connectors call it between steps."""
+    token = _cancel_token.get()
+    if token is not None and token.cancelled:
+        raise FetchCancelled()
+
+
+def _record_cut_short(name: str, query: str, cancel, fetch_start: float) -> None:
+    # A fetch stopped at its deadline counts as a slow failure, so the connector's
+    # p95 (and with it the next deadline) grows until it can finish
+    if getattr(cancel, "expired", False):
+        connector_stats.record_fetch(name, query, time.perf_counter() - fetch_start, False, 0)
+
+
+def _started(begun: threading.Event, times: Dict[str, float], name: str, fn, *args):
+    times[name] = time.monotonic()
+    begun.set()
+    return fn(*args)
+
+
+def plan_sources(query: str, explore: bool = True) -> List[str]:
+    """Connectors search_all would run for `query`; pass them back as `sources` to run exactly those."""
+    schedule, skipped = connector_stats.plan(list(CONNECTORS), query, explore=explore)
+    if skipped:
+        print(f"Skipping low-yield sources for this query: {', '.join(skipped)}")
+        for name in skipped:
+            metrics.connector_skipped.inc(connector=name)
+    return [name for name, _ in schedule]
+
+
+def _run_connector(name: str, connector: BaseConnector, query: str, limit: int, cancel=None) -> List[Dict]:
+    """One connector's cached fetch; runs on the connector pool and stops early once `cancel` is cancelled."""
+    if cancel is not None and cancel.cancelled:
+        return []
+    with tracing.span(f"connector.{name}", query=query, limit=limit) as s, \
+            profiling.stage(f"connector.{name}", inputs={"query": query, "limit": limit}) as record:
+        start = time.perf_counter()
+        ttl = result_store.source_ttl(name)
+        origin = []
+        def fetch():
+            # Persisted result still inside this source's TTL beats a network round trip
+            stored = result_store.load_results(name, query, limit, max_age=ttl)
+            if stored is not None:
+                origin.append("store")
+                return stored["docs"]
+            origin.append("miss")
+            fetch_start = time.perf_counter()
+            token = _cancel_token.set(cancel)
+            try:
+                fetched_docs = _fetch_signals(name, connector, query, limit)
+            except Exception:
+                if cancel is not None and cancel.cancelled:
+                    _record_cut_short(name, query, cancel, fetch_start)
+                    raise FetchCancelled()
+                connector_stats.record_fetch(name, query, time.perf_counter() - fetch_start, False, 0)
+                raise
+            finally:
+                _cancel_token.reset(token)
+            if cancel is not None and cancel.cancelled:
+                # Possibly cut short: neither cached nor stored
+                _record_cut_short(name, query, cancel, fetch_start)
+                raise FetchCancelled()
+            connector_stats.record_fetch(name, query, time.perf_counter() - fetch_start, bool(fetched_docs), len(fetched_docs))
+            if fetched_docs:
+                result_store.save_results(name, query, limit, fetched_docs)
+                return fetched_docs
+            # Source failed or came back empty: serve the last stored result, however old
+            stale = result_store.load_results(name, query, limit)
+            return stale["docs"] if stale else fetched_docs
+        try:
+            try:
+                docs = _results_cache.get_or_set((name, query, limit), fetch, ttl=ttl, cache_if=bool)
+            except FetchCancelled:
+                if cancel is not None and cancel.cancelled:
+                    raise
+                # Joined another search's in-flight fetch and that search was cancelled
+                docs = _results_cache.get_or_set((name, query, limit), fetch, ttl=ttl, cache_if=bool)
+            metrics.cache_requests.inc(cache="connector", result=origin[0] if origin else "hit")
+        except FetchCancelled:
+            s.set_attribute("cancelled", True)
+            docs = []
+        except Exception as e:
+            print(f"Connector {name} failed: {e}")
+            metrics.connector_errors.inc(connector=name)
+            s.record_exception(e)
+            docs = []
+        metrics.connector_latency.observe(time.perf_counter() - start, connector=name)
+        metrics.connector_docs.inc(len(docs), connector=name)
+        s.set_attribute("docs", len(docs))
+        if record is not None:
+            record["outputs"] = docs
+    return docs
+
+
+def search_all(query: str, limit: int = 5, types: Optional[List[str]] = None, cancel=None,
+               sources: Optional[List[str]] = None, explore: bool = True) -> List[Dict]:
     """
     Unified search function that coordinates all connector classes.
+
+    Connectors run concurrently, each under the deadline connector_stats.plan
+    derives from its p95 latency, counted from when the connector starts
+    running rather than from when it was queued on the shared pool. Sources
+    that historically add little for this kind of query are skipped unless
+    `sources` names the connectors to run (see plan_sources); `explore=False`
+    turns off the random re-runs of skipped sources. A connector that misses
+    its deadline is stopped at its next check_cancelled(), keeps nothing it
+    fetched and contributes nothing to this call. `cancel` is an optional token
+    (see app.tools.prefetch.CancelToken); once it is cancelled, queued
+    connectors are skipped, running ones stop likewise and nothing they fetched
+    is cached.
     """
-    aggregator = []
-    
-    # 1. YC (Now Thread-Safe)
-    aggregator.extend(YCombinatorConnector().fetch_signals(query, limit=limit))
-    
-    # 2. Product Hunt
-    aggregator.extend(ProductHuntConnector().fetch_signals(query, limit=limit))
-    
-    # 3. Devpost
-    aggregator.extend(DevpostConnector().fetch_signals(query, limit=limit))
-    
-    # 4. Reddit
-    aggregator.extend(RedditDorkGenerator().fetch_signals(query, limit=limit))
+    if sources is None:
+        sources = plan_sources(query, explore=explore)
+    schedule = connector_stats.schedule([name for name in sources if name in CONNECTORS], query)
+
+    futures, tokens, begun, start_times = {}, {}, {}, {}
+    for name, _ in schedule:
+        if cancel is not None and cancel.cancelled:
+            break
+        tokens[name] = _ConnectorToken(cancel)
+        begun[name] = threading.Event()
+        # Each task gets its own context copy so connector spans join the current trace
+        # and external calls go through the caller's cassette
+        ctx = contextvars.copy_context()
+        futures[name] = _connector_pool.submit(
+            ctx.run, _started, begun[name], start_times, name,
+            _run_connector, name, CONNECTORS[name], query, limit, tokens[name],
+        )
+
+    results = {}
+    for name, seconds in schedule:
+        if cancel is not None and cancel.cancelled:
+            break
+        if name not in futures:
+            continue
+        try:
+            # Waiting for a free pool worker does not count against the connector,
+            # but a task still queued after the longest deadline is given up
+            if not begun[name].wait(timeout=settings.CONNECTOR_DEADLINE_MAX) and futures[name].cancel():
+                raise FutureTimeoutError()
+            results[name] = futures[name].result(timeout=max(0.0, start_times.get(name, time.monotonic()) + seconds - time.monotonic()))
+        except FutureTimeoutError:
+            print(f"Connector {name} missed its {seconds:.1f}s deadline")
+            metrics.connector_timeouts.inc(connector=name)
+            # Stop it so it does not keep a pool worker from other searches
+            tokens[name].expire()
+            results[name] = []
+
+    # Keep the registry's fan-out order regardless of completion order
+    aggregator = [doc for name in CONNECTORS if name in results for doc in results[name]]
     
     # Filter by types if provided
     if types:
@@ -0,0 +1,92 @@
+"""
+Checkpointer for the master graph.
+
+Every completed node is persisted under the run's job id (LangGraph thread_id),
+so a run that fails or times out in a later node is resumed from the last
+completed one instead of re-scraping and re-generating everything. A job's
+checkpoints are deleted once it finishes (see `clear`).
+
+    CHECKPOINT_BACKEND=sqlite   persisted to CHECKPOINT_DB (default)
+    CHECKPOINT_BACKEND=memory   process-local, lost on restart
+    CHECKPOINT_BACKEND=none     no checkpointing
+"""
+import os
+import threading
+import zlib
+
+from app.config.settings import settings
+
+# Checkpoint blobs at least this large (scraped documents, reports) are stored zlib-compressed
+COMPRESS_THRESHOLD = 4096
+_ZLIB_PREFIX = "zlib+"
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def _compressed_serde():
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+    class CompressedSerializer(JsonPlusSerializer):
+        def dumps_typed(self, obj):
+            type_, data = super().dumps_typed(obj)
+            if isinstance(data, bytes) and len(data) >= COMPRESS_THRESHOLD:
+                return _ZLIB_PREFIX + type_, zlib.compress(data)
+            return type_, data
+
+        def loads_typed(self, data):
+            type_, payload = data
+            if type_.startswith(_ZLIB_PREFIX):
+                return super().loads_typed((type_[len(_ZLIB_PREFIX):], zlib.decompress(payload)))
+            return super().loads_typed(data)
+
+    return CompressedSerializer()
+
+
+def _memory_saver():
+    from langgraph.checkpoint.memory import MemorySaver
+    return MemorySaver(serde=_compressed_serde())
+
+
+def _sqlite_saver():
+    import sqlite3
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError:
+        print("Warning: langgraph-checkpoint-sqlite not installed; checkpoints kept in memory only.")
+        return _memory_saver()
+
+    path = settings.CHECKPOINT_DB
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # SqliteSaver serialises access with its own lock, so one connection serves all threads
+    conn = sqlite3.connect(path, check_same_thread=False)
+    return SqliteSaver(conn, serde=_compressed_serde())
+
+
+def get_checkpointer():
+    """Shared checkpointer for the configured backend, or None when disabled."""
+    global _checkpointer
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                backend = (settings.CHECKPOINT_BACKEND or "sqlite").lower()
+                if backend == "none":
+                    _checkpointer = False
+                elif backend == "memory":
+                    _checkpointer = _memory_saver()
+                else:
+                    _checkpointer = _sqlite_saver()
+    return _checkpointer or None
+
+
+def clear(job_id: str) -> None:
+    """Drop every checkpoint of `job_id`."""
+    checkpointer = get_checkpointer()
+    if checkpointer is None:
+        return
+    try:
+        checkpointer.delete_thread(job_id)
+    except Exception as e:
+        print(f"Could not delete checkpoints of job {job_id}: {e}")
@@ -0,0 +1,358 @@
+"""
+Task queue for distributed mode (EXECUTION_MODE=distributed).
+
+Tasks are JSON payloads published on a topic ("browser", "http", "llm") and
+tagged with the job id of the run they belong to. Stateless workers
+(`python -m app.worker --topics ...`) claim tasks for the topics they serve,
+so Playwright-heavy work lands on browser nodes and LLM calls on lightweight
+ones; adding workers adds throughput. Results are kept per task and can be
+collected per job with `job_results` for QUEUE_RESULT_TTL seconds after they
+finish; older finished tasks are deleted so the queue stays bounded.
+
+QUEUE_URL picks the backend:
+    sqlite:///data/queue.sqlite   one host or a shared volume; also the test stand-in
+    redis://host:6379/0           multi-node (optional dependency: `pip install redis`)
+"""
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.config.settings import settings
+
+
+# Job id of the task a worker is running, so the sub-tasks it submits are grouped under it
+current_job_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_job_id", default=None)
+
+
+class RemoteTaskError(RuntimeError):
+    """A worker ran the task and it raised."""
+
+
+class JobQueue(ABC):
+    @abstractmethod
+    def submit(self, topic: str, payload: Dict, job_id: Optional[str] = None) -> str:
+        """Publish a task; returns its task id."""
+
+    @abstractmethod
+    def claim(self, topics: Iterable[str], worker: str) -> Optional[Dict]:
+        """Take the oldest pending task on any of `topics`: {"id", "job_id", "topic", "payload"} or None."""
+
+    @abstractmethod
+    def complete(self, task_id: str, result) -> None:
+        pass
+
+    @abstractmethod
+    def fail(self, task_id: str, error: str) -> None:
+        pass
+
+    @abstractmethod
+    def withdraw(self, task_id: str) -> bool:
+        """Remove a task nobody has claimed yet; False once a worker has it."""
+
+    @abstractmethod
+    def status(self, task_id: str) -> Optional[Dict]:
+        """{"id", "job_id", "topic", "status": pending|running|done|error, "result", "error"}"""
+
+    @abstractmethod
+    def job_results(self, job_id: str) -> List[Dict]:
+        """Status records of every task submitted under `job_id`, oldest first."""
+
+    def wait(self, task_id: str, timeout: float) -> Optional[Dict]:
+        """Block until the task finishes; returns its status record, or None on timeout."""
+        deadline = time.monotonic() + timeout
+        delay = 0.02
+        while True:
+            record = self.status(task_id)
+            if record is None or record["status"] in ("done", "error"):
+                return record
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+
+class SqliteJobQueue(JobQueue):
+    # Finished tasks past QUEUE_RESULT_TTL are swept at most this often (seconds)
+    SWEEP_INTERVAL = 60
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit connection; claims run in explicit BEGIN IMMEDIATE transactions
+        # so two workers (threads or processes) never take the same task
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY, job_id TEXT, topic TEXT, payload TEXT, status TEXT,
+            result TEXT, error TEXT, worker TEXT, created_at REAL, claimed_at REAL, finished_at REAL)""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_pending ON tasks (status, topic, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_job ON tasks (job_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_finished ON tasks (finished_at)")
+        self._last_sweep = 0.0
+
+    def submit(self, topic, payload, job_id=None):
+        task_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO tasks (id, job_id, topic, payload, status, created_at) VALUES (?, ?, ?, ?, 'pending', ?)",
+                (task_id, job_id, topic, json.dumps(payload), time.time()),
+            )
+        return task_id
+
+    def claim(self, topics, worker):
+        topics = list(topics)
+        placeholders = ",".join("?" * len(topics))
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Tasks held longer than the visibility timeout belong to a dead worker
+                self._conn.execute(
+                    f"UPDATE tasks SET status='pending', worker=NULL WHERE status='running' "
+                    f"AND claimed_at < ? AND topic IN ({placeholders})",
+                    [now - settings.QUEUE_VISIBILITY_TIMEOUT] + topics,
+                )
+                row = self._conn.execute(
+                    f"SELECT id, job_id, topic, payload FROM tasks WHERE status='pending' "
+                    f"AND topic IN ({placeholders}) ORDER BY created_at LIMIT 1",
+                    topics,
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE tasks SET status='running', worker=?, claimed_at=? WHERE id=?", (worker, now, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {"id": row[0], "job_id": row[1], "topic": row[2], "payload": json.loads(row[3])}
+
+    def _finish(self, task_id, status, result=None, error=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET status=?, result=?, error=?, finished_at=? WHERE id=?",
+                (status, json.dumps(result), error, now, task_id),
+            )
+            if now - self._last_sweep >= self.SWEEP_INTERVAL:
+                self._last_sweep = now
+                self._conn.execute(
+                    "DELETE FROM tasks WHERE status IN ('done', 'error') AND finished_at < ?",
+                    (now - settings.QUEUE_RESULT_TTL,),
+                )
+
+    def complete(self, task_id, result):
+        self._finish(task_id, "done", result=result)
+
+    def fail(self, task_id, error):
+        self._finish(task_id, "error", error=error)
+
+    def withdraw(self, task_id):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM tasks WHERE id=? AND status='pending'", (task_id,))
+        return cursor.rowcount > 0
+
+    _COLUMNS = "id, job_id, topic, status, result, error"
+
+    @staticmethod
+    def _record(row) -> Dict:
+        task_id, job_id, topic, status, result, error = row
+        return {
+            "id": task_id, "job_id": job_id, "topic": topic, "status": status,
+            "result": json.loads(result) if result else None, "error": error,
+        }
+
+    def status(self, task_id):
+        with self._lock:
+            row = self._conn.execute(f"SELECT {self._COLUMNS} FROM tasks WHERE id=?", (task_id,)).fetchone()
+        return self._record(row) if row else None
+
+    def job_results(self, job_id):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {self._COLUMNS} FROM tasks WHERE job_id=? ORDER BY created_at", (job_id,)
+            ).fetchall()
+        return [self._record(row) for row in rows]
+
+
+class RedisJobQueue(JobQueue):
+    """
+    Lists per topic (`nirnay:queue:<topic>`), one hash per task, a list of task
+    ids per job and a sorted set of running tasks for the visibility timeout.
+    Claims and requeues run as Lua scripts, so a worker dying halfway through
+    one cannot lose the task; finished task hashes and job lists expire after
+    QUEUE_RESULT_TTL.
+    """
+    PREFIX = "nirnay:"
+
+    # KEYS: topic queues in order; ARGV: task key prefix, running set, worker, now.
+    # Hashes deleted meanwhile (withdrawn, expired) are skipped.
+    _CLAIM = """
+    for _, queue in ipairs(KEYS) do
+        local task_id = redis.call('LPOP', queue)
+        while task_id do
+            local task = ARGV[1] .. task_id
+            if redis.call('EXISTS', task) == 1 then
+                redis.call('HSET', task, 'status', 'running', 'worker', ARGV[3], 'claimed_at', ARGV[4])
+                redis.call('ZADD', ARGV[2], ARGV[4], task_id)
+                local fields = redis.call('HMGET', task, 'job_id', 'topic', 'payload')
+                return {task_id, fields[1], fields[2], fields[3]}
+            end
+            task_id = redis.call('LPOP', queue)
+        end
+    end
+    return false
+    """
+    # KEYS: running set; ARGV: task key prefix, queue key prefix, cutoff
+    _REQUEUE = """
+    for _, task_id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], 0, ARGV[3])) do
+        redis.call('ZREM', KEYS[1], task_id)
+        local task = ARGV[1] .. task_id
+        local topic = redis.call('HGET', task, 'topic')
+        if topic then
+            redis.call('HSET', task, 'status', 'pending')
+            redis.call('LPUSH', ARGV[2] .. topic, task_id)
+        end
+    end
+    return 0
+    """
+
+    def __init__(self, url: str):
+        import redis
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._claim = self._redis.register_script(self._CLAIM)
+        self._requeue = self._redis.register_script(self._REQUEUE)
+
+    def _key(self, *parts) -> str:
+        return self.PREFIX + ":".join(parts)
+
+    def submit(self, topic, payload, job_id=None):
+        task_id = uuid.uuid4().hex
+        pipe = self._redis.pipeline()
+        pipe.hset(self._key("task", task_id), mapping={
+            "job_id": job_id or "", "topic": topic, "payload": json.dumps(payload),
+            "status": "pending", "created_at": time.time(),
+        })
+        if job_id:
+            pipe.rpush(self._key("job", job_id), task_id)
+            pipe.expire(self._key("job", job_id), int(settings.QUEUE_TASK_TIMEOUT + settings.QUEUE_RESULT_TTL))
+        pipe.rpush(self._key("queue", topic), task_id)
+        pipe.execute()
+        return task_id
+
+    def _requeue_stale(self):
+        cutoff = time.time() - settings.QUEUE_VISIBILITY_TIMEOUT
+        self._requeue(keys=[self._key("running")], args=[self._key("task", ""), self._key("queue", ""), cutoff])
+
+    def claim(self, topics, worker):
+        self._requeue_stale()
+        claimed = self._claim(
+            keys=[self._key("queue", topic) for topic in topics],
+            args=[self._key("task", ""), self._key("running"), worker, time.time()],
+        )
+        if not claimed:
+            return None
+        task_id, job_id, topic, payload = claimed
+        return {"id": task_id, "job_id": job_id or None, "topic": topic, "payload": json.loads(payload)}
+
+    def _finish(self, task_id, fields):
+        pipe = self._redis.pipeline()
+        pipe.zrem(self._key("running"), task_id)
+        pipe.hset(self._key("task", task_id), mapping=dict(fields, finished_at=time.time()))
+        pipe.expire(self._key("task", task_id), int(settings.QUEUE_RESULT_TTL))
+        pipe.rpush(self._key("done", task_id), 1)
+        pipe.expire(self._key("done", task_id), int(settings.QUEUE_VISIBILITY_TIMEOUT))
+        pipe.execute()
+
+    def complete(self, task_id, result):
+        self._finish(task_id, {"status": "done", "result": json.dumps(result)})
+
+    def fail(self, task_id, error):
+        self._finish(task_id, {"status": "error", "error": error})
+
+    def withdraw(self, task_id):
+        topic = self._redis.hget(self._key("task", task_id), "topic")
+        if topic and self._redis.lrem(self._key("queue", topic), 1, task_id):
+            self._redis.delete(self._key("task", task_id))
+            return True
+        return False
+
+    def status(self, task_id):
+        task = self._redis.hgetall(self._key("task", task_id))
+        if not task:
+            return None
+        return {
+            "id": task_id, "job_id": task.get("job_id") or None, "topic": task.get("topic"),
+            "status": task.get("status"), "result": json.loads(task["result"]) if task.get("result") else None,
+            "error": task.get("error"),
+        }
+
+    def job_results(self, job_id):
+        return [r for r in (self.status(t) for t in self._redis.lrange(self._key("job", job_id), 0, -1)) if r]
+
+    def wait(self, task_id, timeout):
+        record = self.status(task_id)
+        if record is None or record["status"] in ("done", "error"):
+            return record
+        # Completion pushes onto done:<id>, so block on that instead of polling
+        if self._redis.blpop(self._key("done", task_id), timeout=max(1, int(timeout))) is None:
+            return None
+        return self.status(task_id)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> JobQueue:
+    """The process-wide queue for QUEUE_URL."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                url = settings.QUEUE_URL
+                if url.startswith("redis://") or url.startswith("rediss://"):
+                    _queue = RedisJobQueue(url)
+                elif url.startswith("sqlite:///"):
+                    _queue = SqliteJobQueue(url[len("sqlite:///"):])
+                else:
+                    raise ValueError(f"Unsupported QUEUE_URL: {url}")
+    return _queue
+
+
+def distributed() -> bool:
+    return settings.EXECUTION_MODE == "distributed"
+
+
+def run_remote(topic: str, payload: Dict, fallback: Callable, job_id: Optional[str] = None):
+    """
+    Run `payload` on a worker serving `topic` and return its result. If no
+    worker claims the task within QUEUE_CLAIM_TIMEOUT it is withdrawn and
+    `fallback()` runs in this process instead, so a missing worker pool slows
+    a run down rather than hanging it.
+    """
+    queue = get_queue()
+    task_id = queue.submit(topic, payload, job_id=job_id)
+    record = queue.wait(task_id, settings.QUEUE_CLAIM_TIMEOUT)
+    if record is None or record["status"] == "pending":
+        if queue.withdraw(task_id):
+            print(f"No {topic} worker took task {task_id} within {settings.QUEUE_CLAIM_TIMEOUT}s; running locally")
+            return fallback()
+        record = None
+    if record is None:
+        record = queue.wait(task_id, settings.QUEUE_TASK_TIMEOUT)
+    if record is None:
+        raise TimeoutError(f"{topic} task {task_id} did not finish within {settings.QUEUE_TASK_TIMEOUT}s")
+    if record["status"] == "error":
+        raise RemoteTaskError(f"{topic} task {task_id} failed: {record['error']}")
+    return record["result"]
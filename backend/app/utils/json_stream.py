@@ -0,0 +1,148 @@
+"""
+Incremental parser for streamed SynthOutput JSON.
+
+Fed the completion text chunk by chunk, it reports:
+    {"type": "field", "field": "final_summary" | "recommendations", "delta": "..."}
+        as the string value fills in (escapes decoded), and
+    {"type": "table" | "chart", "index": n, "value": {...}}
+        as soon as each element of "tables" / "charts" closes.
+
+Anything before the first "{" (prose, a ```json fence) is skipped. The parser
+only produces progress events; callers still parse the complete text at the
+end, so a malformed stream degrades to the old behaviour.
+"""
+import json
+from typing import Callable, Dict, List, Optional
+
+from app.utils.llm import stream_chat_completion
+
+STREAMED_FIELDS = ("final_summary", "recommendations")
+ARRAY_FIELDS = {"tables": "table", "charts": "chart"}
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class SynthStreamParser:
+    def __init__(self):
+        self._stack: List[str] = []      # open containers, "{" / "["
+        self._in_string = False
+        self._escape = None              # None, "" after a backslash, or the \\u hex digits so far
+        self._string = []                # current string (keys and unstreamed values)
+        self._high_surrogate = None      # first half of a \uD83D\uDE00-style pair
+        self._expect_key = False
+        self._key = None                 # current key of the top-level object
+        self._capture = None             # raw text of the table/chart being read
+        self._counts = {name: 0 for name in ARRAY_FIELDS}
+        self._started = False
+
+    def feed(self, text: str) -> List[Dict]:
+        events: List[Dict] = []
+        delta: List[str] = []
+        for ch in text:
+            if not self._started:
+                if ch != "{":
+                    continue
+                self._started = True
+            if self._capture is not None:
+                self._capture.append(ch)
+            if self._in_string:
+                self._string_char(ch, delta)
+                if not self._in_string:
+                    self._flush(delta, events)
+                continue
+            self._flush(delta, events)
+            self._structure_char(ch, events)
+        self._flush(delta, events)
+        return events
+
+    # --- strings ---
+
+    def _streaming(self) -> bool:
+        return len(self._stack) == 1 and not self._expect_key and self._key in STREAMED_FIELDS
+
+    def _emit_char(self, c: str, delta: List[str]) -> None:
+        if self._streaming():
+            delta.append(c)
+        else:
+            self._string.append(c)
+
+    def _string_char(self, ch: str, delta: List[str]) -> None:
+        if self._escape is not None:
+            if self._escape == "" and ch != "u":
+                self._emit_char(_ESCAPES.get(ch, ch), delta)
+                self._escape = None
+            elif self._escape == "":
+                self._escape = "u"
+            else:
+                self._escape += ch
+                if len(self._escape) == 5:
+                    try:
+                        code = int(self._escape[1:], 16)
+                    except ValueError:
+                        code = None
+                    self._escape = None
+                    if code is not None and 0xD800 <= code < 0xDC00:
+                        self._high_surrogate = code
+                    elif code is not None and 0xDC00 <= code < 0xE000 and self._high_surrogate:
+                        pair = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+                        self._high_surrogate = None
+                        self._emit_char(chr(pair), delta)
+                    elif code is not None:
+                        self._emit_char(chr(code), delta)
+            return
+        if ch == "\\":
+            self._escape = ""
+        elif ch == '"':
+            self._in_string = False
+            if len(self._stack) == 1 and self._expect_key:
+                self._key = "".join(self._string)
+        else:
+            self._emit_char(ch, delta)
+
+    def _flush(self, delta: List[str], events: List[Dict]) -> None:
+        if delta:
+            events.append({"type": "field", "field": self._key, "delta": "".join(delta)})
+            delta.clear()
+
+    # --- structure ---
+
+    def _structure_char(self, ch: str, events: List[Dict]) -> None:
+        if ch == '"':
+            self._in_string = True
+            self._string = []
+        elif ch in "{[":
+            if ch == "{" and self._stack == ["{", "["] and self._key in ARRAY_FIELDS:
+                self._capture = ["{"]
+            self._stack.append(ch)
+            self._expect_key = ch == "{" and len(self._stack) == 1
+        elif ch in "}]":
+            if self._stack:
+                self._stack.pop()
+            if self._capture is not None and self._stack == ["{", "["]:
+                self._close_capture(events)
+        elif ch == ":" and len(self._stack) == 1:
+            self._expect_key = False
+        elif ch == "," and len(self._stack) == 1:
+            self._expect_key = True
+
+    def _close_capture(self, events: List[Dict]) -> None:
+        raw = "".join(self._capture)
+        self._capture = None
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            return
+        kind = ARRAY_FIELDS[self._key]
+        events.append({"type": kind, "index": self._counts[self._key], "value": value})
+        self._counts[self._key] += 1
+
+
+def stream_synth_completion(on_event: Optional[Callable[[Dict], None]] = None, **kwargs) -> str:
+    """Stream a SynthOutput-shaped completion, passing parser events to on_event; returns the full text."""
+    parser = SynthStreamParser()
+
+    def on_delta(text: str) -> None:
+        for event in parser.feed(text):
+            on_event(event)
+
+    return stream_chat_completion(on_delta=on_delta if on_event else None, **kwargs)
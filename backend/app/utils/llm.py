@@ -0,0 +1,173 @@
+import contextvars
+import threading
+import time
+import hashlib
+import json
+from contextlib import contextmanager
+from app.bench import recorder
+from app.config.settings import settings
+from app.utils import metrics, tracing
+from app.utils.cache import TTLCache
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Response cache for identical requests; on when LLM_CACHE_TTL > 0 or inside shared_response_cache()
+_responses = TTLCache(maxsize=2048)
+# Context-local, so only calls made for the block's own work (its tasks and the
+# threads they hand off to with copy_context) share responses, not unrelated
+# requests running in the same process
+_cache_scope: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_cache_scope", default=False)
+
+
+@contextmanager
+def shared_response_cache():
+    """Reuse responses to identical completion requests made within the block (e.g. a batch)."""
+    token = _cache_scope.set(True)
+    try:
+        yield
+    finally:
+        _cache_scope.reset(token)
+
+
+def _cache_key(kwargs) -> str:
+    return hashlib.sha256(json.dumps(kwargs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def get_client():
+    """
+    Shared OpenAI-compatible client, created on first use. Keyed by endpoint and
+    key so overriding settings.LLM_BASE_URL (tests, mock server) takes effect.
+    """
+    key = (settings.LLM_BASE_URL, settings.GOOGLE_API_KEY)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                from openai import OpenAI
+                client = _clients[key] = OpenAI(api_key=settings.GOOGLE_API_KEY, base_url=settings.LLM_BASE_URL)
+    return client
+
+
+def _load_completion(data):
+    from openai.types.chat import ChatCompletion
+    return ChatCompletion.model_validate(data)
+
+
+def chat_completion(client=None, **kwargs):
+    """
+    Single choke point for chat completion calls so every LLM request is traced
+    and metered with its model and token usage.
+    """
+    ttl = settings.LLM_CACHE_TTL or (3600 if _cache_scope.get() else 0)
+    if not ttl:
+        return _create(client, kwargs)
+
+    computed = []
+    def create():
+        computed.append(True)
+        return _create(client, kwargs)
+    response = _responses.get_or_set(_cache_key(kwargs), create, ttl=ttl)
+    metrics.cache_requests.inc(cache="llm", result="miss" if computed else "hit")
+    return response
+
+
+def _create(client, kwargs):
+    client = client or get_client()
+    model = kwargs.get("model")
+    with tracing.span("llm.chat", **{"llm.model": model}) as s:
+        start = time.perf_counter()
+        try:
+            response = recorder.intercept(
+                "llm", kwargs, lambda: client.chat.completions.create(**kwargs),
+                dump=lambda r: r.model_dump(), load=_load_completion
+            )
+        except Exception:
+            metrics.llm_calls.inc(model=model, status="error")
+            raise
+        finally:
+            metrics.llm_latency.observe(time.perf_counter() - start, model=model)
+        metrics.llm_calls.inc(model=model, status="ok")
+
+        _record_usage(s, getattr(response, "usage", None), model)
+        return response
+
+
+def _record_usage(s, usage, model) -> None:
+    """Token counts on the span and in llm_tokens, including prompt tokens served from the provider's cache."""
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+    completion_tokens = getattr(usage, "completion_tokens", None) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", None) if details is not None else None) or 0
+    s.set_attribute("llm.prompt_tokens", prompt_tokens)
+    s.set_attribute("llm.completion_tokens", completion_tokens)
+    s.set_attribute("llm.cached_tokens", cached_tokens)
+    s.set_attribute("llm.total_tokens", getattr(usage, "total_tokens", None))
+    metrics.llm_tokens.inc(prompt_tokens, model=model, kind="prompt")
+    metrics.llm_tokens.inc(completion_tokens, model=model, kind="completion")
+    metrics.llm_tokens.inc(cached_tokens, model=model, kind="cached")
+
+
+def stream_chat_completion(on_delta=None, client=None, **kwargs) -> str:
+    """
+    Streaming variant of chat_completion: `on_delta(text)` is called with each
+    content fragment as it arrives and the full content is returned. Cached and
+    replayed responses are delivered through on_delta as their recorded fragments.
+    """
+    ttl = settings.LLM_CACHE_TTL or (3600 if _cache_scope.get() else 0)
+    streamed = []
+    def create():
+        return _create_stream(client, kwargs, on_delta, streamed)
+
+    if ttl:
+        pieces = _responses.get_or_set(_cache_key(dict(kwargs, stream=True)), create, ttl=ttl)
+        metrics.cache_requests.inc(cache="llm", result="miss" if streamed else "hit")
+    else:
+        pieces = create()
+    if not streamed and on_delta is not None:
+        for piece in pieces:
+            on_delta(piece)
+    return "".join(pieces)
+
+
+def _create_stream(client, kwargs, on_delta, streamed):
+    client = client or get_client()
+    model = kwargs.get("model")
+
+    def live():
+        pieces = []
+        usage = None
+        stream = client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **kwargs)
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if not text:
+                continue
+            if not pieces:
+                s.set_attribute("llm.ttft_s", round(time.perf_counter() - start, 4))
+                metrics.llm_ttft.observe(time.perf_counter() - start, model=model)
+            pieces.append(text)
+            streamed.append(True)
+            if on_delta is not None:
+                on_delta(text)
+        _record_usage(s, usage, model)
+        return pieces
+
+    with tracing.span("llm.chat", **{"llm.model": model, "llm.stream": True}) as s:
+        start = time.perf_counter()
+        try:
+            # Cassettes store the fragments, so replays stream the same way
+            pieces = recorder.intercept("llm", dict(kwargs, stream=True), live)
+        except Exception:
+            metrics.llm_calls.inc(model=model, status="error")
+            raise
+        finally:
+            metrics.llm_latency.observe(time.perf_counter() - start, model=model)
+        metrics.llm_calls.inc(model=model, status="ok")
+        return pieces
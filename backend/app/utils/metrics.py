@@ -0,0 +1,198 @@
+"""
+In-process Prometheus-style metrics for the analysis pipeline.
+
+Metrics are plain counters / gauges / histograms guarded by one lock each, so
+recording on the hot path costs a dict lookup and an add. They are exposed as
+Prometheus text on /metrics and as JSON on /metrics.json by
+start_metrics_server(), and in-process through snapshot().
+"""
+import bisect
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value) -> str:
+    """Label value as the Prometheus text format requires: \\, \" and \n escaped."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _label_str(self, key: Tuple[str, ...], extra: Optional[Dict[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _render(self) -> List[str]:
+        return [f"{self.name}{self._label_str(k)} {v}" for k, v in self._values.items()]
+
+    def _snapshot(self):
+        return {",".join(k) or "": v for k, v in self._values.items()}
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket (non-cumulative) counts + the +Inf bucket, then sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return sum(state[0]) if state else 0
+
+    def _render(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._values.items():
+            running = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                running += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{self._label_str(key, {'le': le})} {running}")
+            lines.append(f"{self.name}_sum{self._label_str(key)} {total}")
+            lines.append(f"{self.name}_count{self._label_str(key)} {running}")
+        return lines
+
+    def _snapshot(self):
+        return {
+            ",".join(k) or "": {"count": sum(counts), "sum": total}
+            for k, (counts, total) in self._values.items()
+        }
+
+
+# --- Pipeline metrics ---
+
+pipeline_requests = Counter("nirnay_pipeline_requests_total", "run_master_agent calls", ["status"])
+pipeline_latency = Histogram("nirnay_pipeline_duration_seconds", "run_master_agent wall time")
+queue_depth = Gauge("nirnay_queue_depth", "Requests waiting or in flight", ["queue"])
+
+connector_latency = Histogram("nirnay_connector_duration_seconds", "Connector fetch time", ["connector"])
+connector_errors = Counter("nirnay_connector_errors_total", "Connector fetch failures", ["connector"])
+connector_docs = Counter("nirnay_connector_docs_total", "Documents returned by connectors", ["connector"])
+connector_timeouts = Counter("nirnay_connector_timeouts_total", "Connector fetches past their deadline", ["connector"])
+connector_skipped = Counter("nirnay_connector_skipped_total", "Connectors skipped as low-yield", ["connector"])
+
+llm_calls = Counter("nirnay_llm_calls_total", "Chat completion calls", ["model", "status"])
+llm_tokens = Counter("nirnay_llm_tokens_total", "Tokens used by chat completions", ["model", "kind"])
+llm_latency = Histogram("nirnay_llm_duration_seconds", "Chat completion latency", ["model"])
+llm_ttft = Histogram("nirnay_llm_time_to_first_token_seconds", "Streamed completion time to first token", ["model"])
+
+relevance_dropped = Counter("nirnay_relevance_dropped_docs_total", "Documents dropped by the relevance filter")
+
+cache_requests = Counter("nirnay_cache_requests_total", "Cache lookups", ["cache", "result"])
+
+router_decisions = Counter("nirnay_router_decisions_total", "Agents selected by the router", ["agent"])
+
+worker_tasks = Counter("nirnay_worker_tasks_total", "Queue tasks run by workers", ["topic", "status"])
+worker_latency = Histogram("nirnay_worker_task_duration_seconds", "Queue task run time on a worker", ["topic"])
+
+
+def render_prometheus() -> str:
+    out = []
+    for metric in _registry:
+        out.append(f"# HELP {metric.name} {metric.help}")
+        out.append(f"# TYPE {metric.name} {metric.kind}")
+        with metric._lock:
+            out.extend(metric._render())
+    return "\n".join(out) + "\n"
+
+
+def snapshot() -> Dict[str, Dict]:
+    """Current metric values keyed by metric name, then by comma-joined label values."""
+    result = {}
+    for metric in _registry:
+        with metric._lock:
+            result[metric.name] = metric._snapshot()
+    return result
+
+
+def reset() -> None:
+    for metric in _registry:
+        metric.clear()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = render_prometheus().encode()
+            content_type = "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body = json.dumps(snapshot()).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics and /metrics.json from a daemon thread (local only unless `host` says otherwise)."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics endpoint listening on http://{host}:{server.server_address[1]}/metrics")
+    return server
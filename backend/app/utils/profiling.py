@@ -0,0 +1,328 @@
+"""
+Opt-in profiling of run_master_agent (PROFILE=1 or run_master_agent(profile=True)).
+
+Each profiled run writes a directory under PROFILE_DIR:
+
+    manifest.json     query, job id, timings, settings that shape the run
+    stages.jsonl      one record per stage (graph node, connector fetch, PDF
+                      render): inputs, outputs, wall time, error
+    cassette.json     every LLM / HTTP / browser call of the run (app.bench.recorder)
+    <stage>.prof/.txt cProfile stats per stage (or pyinstrument .html/.txt with
+                      PROFILE_ENGINE=pyinstrument)
+    memory-*.txt      tracemalloc allocation hotspots at the end of each graph node
+
+Graph nodes can be re-run offline from their recorded inputs, with external
+calls served from the cassette:
+
+    python -m app.utils.profiling replay profiles/<run> [--stage node.synthesizer] [--profile]
+"""
+import argparse
+import cProfile
+import contextvars
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+
+from app.bench import recorder
+from app.config.settings import settings
+
+_current: contextvars.ContextVar[Optional["ProfileSession"]] = contextvars.ContextVar("profile_session", default=None)
+# Sessions by job id, for stages running on threads that did not inherit the context
+_sessions: Dict[str, "ProfileSession"] = {}
+# cProfile follows one thread before Python 3.12 and the whole process (one
+# profiler at a time) from 3.12 on; a stage that starts while an enclosing
+# profiler already covers it is only timed
+_cpu_threads = threading.local()
+_cpu_lock = threading.Lock()
+# tracemalloc and the profilers are process-wide, so only one run is profiled at
+# a time; a run that starts while another is profiled runs unprofiled
+_run_lock = threading.Lock()
+
+# Settings recorded in the manifest: they change which stages run and what they return
+_MANIFEST_SETTINGS = (
+    "EXECUTION_MODE", "SPECULATIVE_PREFETCH", "LLM_CACHE_TTL", "RESULTS_DB", "VECTOR_INDEX_PATH",
+    "HISTORY_SHORTCUT_SCORE", "RELEVANCE_THRESHOLD", "RELEVANCE_MIN_KEEP", "RELEVANCE_MODEL",
+    "CONNECTOR_STATS_DB", "SOURCE_TARGET_RECALL", "CHECKPOINT_BACKEND",
+)
+
+
+def _claim_cpu() -> bool:
+    if sys.version_info >= (3, 12):
+        return _cpu_lock.acquire(blocking=False)
+    if getattr(_cpu_threads, "active", False):
+        return False
+    _cpu_threads.active = True
+    return True
+
+
+def _release_cpu() -> None:
+    if sys.version_info >= (3, 12):
+        _cpu_lock.release()
+    else:
+        _cpu_threads.active = False
+
+
+def _jsonable(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+
+class ProfileSession:
+    def __init__(self, job_id: str, query: str, directory: str):
+        self.job_id = job_id
+        self.query = query
+        self.directory = directory
+        self.engine = settings.PROFILE_ENGINE
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _name(self, stage: str, prefix: str = "") -> str:
+        """Unique file stem for `stage` (repeated stages get -1, -2, ...)."""
+        safe = prefix + re.sub(r"[^A-Za-z0-9_.-]+", "_", stage)
+        with self._lock:
+            n = self._counts.get(safe, 0)
+            self._counts[safe] = n + 1
+        return safe if n == 0 else f"{safe}-{n}"
+
+    def record_stage(self, record: Dict) -> None:
+        line = json.dumps(_jsonable(record))
+        with self._lock:
+            with open(os.path.join(self.directory, "stages.jsonl"), "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    @contextmanager
+    def cpu_profile(self, stage: str):
+        if not _claim_cpu():
+            yield
+            return
+        name = self._name(stage)
+        try:
+            if self.engine == "pyinstrument":
+                try:
+                    from pyinstrument import Profiler
+                except ImportError:
+                    print("Warning: pyinstrument not installed; using cProfile.")
+                else:
+                    profiler = Profiler()
+                    profiler.start()
+                    try:
+                        yield
+                    finally:
+                        profiler.stop()
+                        with open(os.path.join(self.directory, f"{name}.html"), "w", encoding="utf-8") as f:
+                            f.write(profiler.output_html())
+                        with open(os.path.join(self.directory, f"{name}.txt"), "w", encoding="utf-8") as f:
+                            f.write(profiler.output_text(unicode=True))
+                    return
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                profiler.dump_stats(os.path.join(self.directory, f"{name}.prof"))
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+                with open(os.path.join(self.directory, f"{name}.txt"), "w", encoding="utf-8") as f:
+                    f.write(out.getvalue())
+        finally:
+            _release_cpu()
+
+    def memory_snapshot(self, label: str) -> None:
+        if not tracemalloc.is_tracing():
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"current={current / 1e6:.1f}MB peak={peak / 1e6:.1f}MB", ""]
+        lines += [str(stat) for stat in snapshot.statistics("lineno")[:30]]
+        with open(os.path.join(self.directory, f"{self._name(label, prefix='memory-')}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def write_manifest(self, **extra) -> None:
+        manifest = {
+            "job_id": self.job_id,
+            "query": self.query,
+            "started_at": self.started,
+            "elapsed_s": round(time.time() - self.started, 3),
+            "python": sys.version.split()[0],
+            "engine": self.engine,
+            "settings": {key: getattr(settings, key, None) for key in _MANIFEST_SETTINGS},
+        }
+        manifest.update(extra)
+        with open(os.path.join(self.directory, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(_jsonable(manifest), f, indent=2)
+
+
+def enabled(flag: Optional[bool] = None) -> bool:
+    return settings.PROFILE if flag is None else flag
+
+
+def active(job_id: Optional[str] = None) -> Optional[ProfileSession]:
+    return _current.get() or (_sessions.get(job_id) if job_id else None)
+
+
+@contextmanager
+def profile_run(job_id: str, query: str):
+    """Profile one run_master_agent call; yields the session, or None when another run is being profiled."""
+    if not _run_lock.acquire(blocking=False):
+        print(f"Profiling skipped for job {job_id}: another profiled run is in progress")
+        yield None
+        return
+    try:
+        with _profile_run(job_id, query) as session:
+            yield session
+    finally:
+        _run_lock.release()
+
+
+@contextmanager
+def _profile_run(job_id: str, query: str):
+    directory = os.path.join(settings.PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{job_id[:12]}")
+    session = ProfileSession(job_id, query, directory)
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start(settings.PROFILE_TRACEMALLOC_FRAMES)
+    # Record external calls unless a cassette is already in use (e.g. a benchmark replay)
+    recording = recorder.active_cassette() is None
+    cassette = (
+        recorder.use_cassette(os.path.join(directory, "cassette.json"), mode="record")
+        if recording else nullcontext()
+    )
+    token = _current.set(session)
+    _sessions[job_id] = session
+    error = None
+    try:
+        with cassette:
+            yield session
+    except Exception as e:
+        error = repr(e)
+        raise
+    finally:
+        _current.reset(token)
+        _sessions.pop(job_id, None)
+        session.memory_snapshot("final")
+        if started_tracemalloc:
+            tracemalloc.stop()
+        session.write_manifest(error=error, cassette=recording)
+        print(f"Profile written to {directory}")
+
+
+@contextmanager
+def stage(name: str, job_id: Optional[str] = None, inputs=None, memory: bool = False):
+    """
+    Capture a stage of a profiled run: yields a dict whose "outputs" key the
+    caller fills in, or None (and costs nothing) when no profile is active.
+    """
+    session = active(job_id)
+    if session is None:
+        yield None
+        return
+    token = _current.set(session)
+    record = {"stage": name, "job_id": session.job_id, "inputs": inputs, "outputs": None, "error": None}
+    start = time.perf_counter()
+    try:
+        with session.cpu_profile(name):
+            yield record
+    except Exception as e:
+        record["error"] = repr(e)
+        raise
+    finally:
+        record["elapsed_s"] = round(time.perf_counter() - start, 4)
+        session.record_stage(record)
+        if memory:
+            session.memory_snapshot(name)
+        _current.reset(token)
+
+
+def profiled(name: str):
+    """Decorator form of `stage` for CPU-bound helpers (records timing and CPU profile, not arguments)."""
+    def decorator(fn):
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+    return decorator
+
+
+# --- Offline replay ---
+
+def replay(directory: str, only: Optional[str] = None, profile: bool = False) -> int:
+    """Re-run recorded graph nodes from their inputs with external calls served by the cassette."""
+    from app.agents.master_agent import NODES, MasterState, node_update_to_json
+
+    # Stages must not be short-circuited by local state the recorded run did not see
+    for key, value in (("LLM_CACHE_TTL", 0), ("RESULTS_DB", ""), ("VECTOR_INDEX_PATH", ""),
+                       ("CONNECTOR_STATS_DB", ""), ("EXECUTION_MODE", "local"), ("SPECULATIVE_PREFETCH", False),
+                       ("SOURCE_EXPLORE_RATE", 0.0)):
+        setattr(settings, key, value)
+
+    with open(os.path.join(directory, "stages.jsonl"), encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    nodes = [r for r in records if r["stage"].startswith("node.") and (only is None or r["stage"] == only)]
+    if not nodes:
+        print(f"No recorded graph node stages{f' named {only}' if only else ''} in {directory}")
+        return 1
+
+    failures = 0
+    with recorder.use_cassette(os.path.join(directory, "cassette.json"), mode="replay") as cassette:
+        for record in nodes:
+            node = record["stage"][len("node."):]
+            state = MasterState.model_validate(record["inputs"])
+            start = time.perf_counter()
+            profiler = cProfile.Profile() if profile else None
+            try:
+                if profiler:
+                    profiler.enable()
+                outputs = node_update_to_json(NODES[node](state))
+            except Exception as e:
+                failures += 1
+                print(f"{record['stage']}: failed ({e!r})")
+                continue
+            finally:
+                if profiler:
+                    profiler.disable()
+            elapsed = time.perf_counter() - start
+            same = json.dumps(outputs, sort_keys=True, default=str) == json.dumps(record["outputs"], sort_keys=True, default=str)
+            print(f"{record['stage']}: {elapsed:.3f}s (recorded {record.get('elapsed_s')}s), "
+                  f"output {'identical' if same else 'differs'}")
+            if profiler:
+                pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+        print(f"Cassette: {cassette.hits} hits, {cassette.misses} misses")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.utils.profiling", description="Replay a profiled run offline")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rp = sub.add_parser("replay", help="Re-run recorded graph nodes against the run's cassette")
+    rp.add_argument("directory")
+    rp.add_argument("--stage", default=None, help="Only this stage, e.g. node.synthesizer")
+    rp.add_argument("--profile", action="store_true", help="Print cProfile stats for each replayed stage")
+    args = parser.parse_args()
+    return replay(args.directory, only=args.stage, profile=args.profile)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
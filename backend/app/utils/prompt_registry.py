@@ -0,0 +1,159 @@
+"""
+Registry of the prompts sent by the agents, compiled once at first use.
+
+Each template is split into a static system part (instructions, identical on
+every call) and a small user template holding the per-request data, and
+messages are always ordered static-first. That keeps the prompt prefix
+byte-stable across calls, which is what provider-side prefix caching keys on;
+cached prompt tokens are reported by app.utils.llm as llm_tokens{kind="cached"}.
+
+With LLM_CONTEXT_CACHE=gemini (optional: `pip install google-genai`) the
+static part of large enough templates is also uploaded once as explicit
+Gemini cached content and referenced by name instead of being re-sent.
+
+With the default LLM_CONTEXT_CACHE_MIN_TOKENS none of the built-in templates
+is large enough, so this path only runs for larger overrides or a lower minimum.
+
+PROMPT_OVERRIDES may point to a JSON file {"name": {"system": ..., "user": ...}}
+overriding any template.
+"""
+import hashlib
+import json
+import string
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from app.config.settings import settings
+from app.utils import prompts
+from app.utils.cache import TTLCache
+
+
+class PromptTemplate:
+    def __init__(self, name: str, system: str, user: str):
+        self.name = name
+        self.system = system.strip()
+        # (literal, field) pairs, parsed once instead of on every str.format call
+        self._segments: List[Tuple[str, Optional[str]]] = [
+            (literal, field) for literal, field, _, _ in string.Formatter().parse(user)
+        ]
+        self.fields = {field for _, field in self._segments if field}
+        self.prefix_hash = hashlib.sha1(self.system.encode("utf-8")).hexdigest()[:16]
+
+    def render(self, **values) -> str:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt {self.name} is missing {', '.join(sorted(missing))}")
+        return "".join(literal + (str(values[field]) if field else "") for literal, field in self._segments)
+
+    def messages(self, **values) -> List[Dict]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.render(**values)},
+        ]
+
+
+_DEFINITIONS = {
+    "router": (
+        prompts.ROUTER_SYSTEM_PROMPT + "\n" + prompts.MASTER_AGENT_ROUTER_PROMPT,
+        "Analyze this query and route it appropriately:\n\nQuery: {query}",
+    ),
+    "synthesizer": (
+        prompts.SYNTH_SYSTEM_PROMPT + "\n" + prompts.SYNTH_PROMPT,
+        "Synthesize these results for the query.\n\nOriginal Query: {query}\n\nAgent Results:\n{results}\n\n"
+        "Provide a comprehensive final summary with recommendations.",
+    ),
+    "report_generator": (
+        prompts.REPORT_GENERATOR_PROMPT,
+        "User Query: {query}\n{context}",
+    ),
+    "web_intel_tool": (prompts.WEB_INTEL_SYSTEM_PROMPT, "{query}"),
+    "web_intel_summary": (
+        prompts.WEB_INTEL_SUMMARY_PROMPT,
+        "Create a concise structured summary for the query: {query}",
+    ),
+    "master": (prompts.MASTER_PROMPT, "DOCUMENTS:\n{docs_array}\n\nSUMMARY:\n{summary_array}"),
+}
+
+_registry: Dict[str, PromptTemplate] = {}
+_registry_lock = threading.Lock()
+
+
+def _load() -> Dict[str, PromptTemplate]:
+    definitions = dict(_DEFINITIONS)
+    if settings.PROMPT_OVERRIDES:
+        try:
+            with open(settings.PROMPT_OVERRIDES, encoding="utf-8") as f:
+                for name, override in json.load(f).items():
+                    system, user = definitions.get(name, ("", "{query}"))
+                    definitions[name] = (override.get("system", system), override.get("user", user))
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Could not load prompt overrides from {settings.PROMPT_OVERRIDES}: {e}")
+    return {name: PromptTemplate(name, system, user) for name, (system, user) in definitions.items()}
+
+
+def get(name: str) -> PromptTemplate:
+    if not _registry:
+        with _registry_lock:
+            if not _registry:
+                _registry.update(_load())
+    return _registry[name]
+
+
+# --- Explicit context caching ---
+
+# (model, prefix hash) -> cached content name, or False when the prefix could not be cached
+_context_caches = TTLCache(maxsize=64)
+
+
+def _create_gemini_cache(model: str, template: PromptTemplate):
+    try:
+        from google import genai
+        from google.genai import types
+    except ImportError:
+        print("Warning: google-genai not installed; LLM_CONTEXT_CACHE disabled.")
+        return False
+    try:
+        client = genai.Client(api_key=settings.GOOGLE_API_KEY)
+        cache = client.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                display_name=f"nirnay-{template.name}-{template.prefix_hash}",
+                system_instruction=template.system,
+                ttl=f"{settings.LLM_CONTEXT_CACHE_TTL}s",
+            ),
+        )
+        return cache.name
+    except Exception as e:
+        print(f"Could not create context cache for prompt {template.name}: {e}")
+        return False
+
+
+def _cached_content(model: str, template: PromptTemplate) -> Optional[str]:
+    if settings.LLM_CONTEXT_CACHE != "gemini":
+        return None
+    # Providers refuse caches below a minimum size; ~4 characters per token
+    if len(template.system) / 4 < settings.LLM_CONTEXT_CACHE_MIN_TOKENS:
+        return None
+    # Refresh a little before the provider-side cache expires
+    ttl = max(settings.LLM_CONTEXT_CACHE_TTL - 60, 60)
+    name = _context_caches.get_or_set(
+        (model, template.prefix_hash), lambda: _create_gemini_cache(model, template), ttl=ttl
+    )
+    return name or None
+
+
+def request(name: str, model: str, extra_messages: Optional[List[Dict]] = None, **values) -> Dict:
+    """
+    chat_completion keyword arguments for prompt `name`: model and messages in
+    static-first order (`extra_messages` appended after the rendered user
+    message), plus the cached-content reference when one is available.
+    """
+    template = get(name)
+    messages = template.messages(**values) + list(extra_messages or [])
+    kwargs = {"model": model, "messages": messages}
+    cached = _cached_content(model, template)
+    if cached:
+        # The cached content already carries the system instruction
+        kwargs["messages"] = messages[1:]
+        kwargs["extra_body"] = {"extra_body": {"google": {"cached_content": cached}}}
+    return kwargs
@@ -0,0 +1,237 @@
+"""
+Request-scoped tracing for the analysis pipeline.
+
+Every call to run_master_agent opens a trace; graph nodes, connector fetches,
+LLM calls and PDF renders open child spans under it. Finished spans are
+exported as OTLP/JSON lines (the format the OpenTelemetry collector's file
+exporter writes and its `otlpjsonfile` receiver reads) or printed to the
+console, depending on settings.TRACE_EXPORTER:
+
+    TRACE_EXPORTER=none     spans are timed but not exported (default)
+    TRACE_EXPORTER=console  one readable line per span on stderr
+    TRACE_EXPORTER=file     OTLP/JSON lines appended to settings.TRACE_FILE
+
+Latency breakdown of an exported file:
+
+    python -m app.utils.tracing logs/traces.jsonl
+"""
+import contextvars
+import functools
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from app.config.settings import settings
+
+SERVICE_NAME = "nirnay-backend"
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """A single timed operation inside a trace."""
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.events: List[Dict[str, Any]] = []
+        self.status = "OK"
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes) -> None:
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = "ERROR"
+        self.status_message = f"{type(exc).__name__}: {exc}"
+        self.add_event("exception", type=type(exc).__name__, message=str(exc))
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "events": [
+                {"name": e["name"], "timeUnixNano": str(e["time_ns"]), "attributes": _otlp_attributes(e["attributes"])}
+                for e in self.events
+            ],
+            # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+            "status": {"code": 2 if self.status == "ERROR" else 1, "message": self.status_message},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+                "scopeSpans": [{"scope": {"name": "app.utils.tracing"}, "spans": [span]}],
+            }]
+        }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+
+# --- Exporters ---
+
+class ConsoleSpanExporter:
+    def export(self, span: Span) -> None:
+        attrs = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+        print(f"[trace {span.trace_id[:8]}] {span.name} {span.duration_ms:.1f}ms {span.status} {attrs}", file=sys.stderr)
+
+
+class FileSpanExporter:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_otlp())
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter():
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                kind = (settings.TRACE_EXPORTER or "none").lower()
+                if kind == "console":
+                    _exporter = ConsoleSpanExporter()
+                elif kind == "file":
+                    _exporter = FileSpanExporter(settings.TRACE_FILE)
+                else:
+                    _exporter = False
+    return _exporter or None
+
+
+def set_exporter(exporter) -> None:
+    """Override the configured exporter (None disables export)."""
+    global _exporter
+    _exporter = exporter if exporter is not None else False
+
+
+# --- Public API ---
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a block as a span. Opens a new trace if no span is active, so the
+    outermost span of a request becomes its root and carries its trace id.
+    """
+    parent = _current_span.get()
+    trace_id = parent.trace_id if parent else secrets.token_hex(16)
+    s = Span(name, trace_id, parent.span_id if parent else None, attributes)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.record_exception(e)
+        raise
+    finally:
+        s.end_ns = time.time_ns()
+        _current_span.reset(token)
+        exporter = get_exporter()
+        if exporter:
+            try:
+                exporter.export(s)
+            except Exception as e:
+                print(f"Trace export failed: {e}")
+
+
+def traced(name: str):
+    """Decorator form of span() for functions that run as one stage."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- Latency breakdown ---
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(path: str) -> Dict[str, Dict[str, float]]:
+    """Per span-name count and p50/p99 latency (ms) from an OTLP/JSON trace file."""
+    durations: Dict[str, List[float]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for rs in json.loads(line).get("resourceSpans", []):
+                for ss in rs.get("scopeSpans", []):
+                    for sp in ss.get("spans", []):
+                        ms = (int(sp["endTimeUnixNano"]) - int(sp["startTimeUnixNano"])) / 1e6
+                        durations.setdefault(sp["name"], []).append(ms)
+    return {
+        name: {"count": len(v), "p50_ms": _percentile(v, 50), "p99_ms": _percentile(v, 99)}
+        for name, v in durations.items()
+    }
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else settings.TRACE_FILE
+    rows = sorted(summarize(path).items(), key=lambda kv: kv[1]["p99_ms"], reverse=True)
+    print(f"{'span':<32}{'count':>8}{'p50 ms':>12}{'p99 ms':>12}")
+    for name, stats in rows:
+        print(f"{name:<32}{stats['count']:>8}{stats['p50_ms']:>12.1f}{stats['p99_ms']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
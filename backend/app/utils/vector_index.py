@@ -0,0 +1,161 @@
+"""
+Persistent flat vector index backed by NumPy memmaps.
+
+Layout under `path/`:
+    vectors.f16   float16 rows of L2-normalised vectors (capacity x dim)
+    kinds.u8      one small int tag per row, so lookups can be restricted by kind
+    meta.sqlite   row id -> optional dedupe key and JSON payload, plus the row count and dim
+
+Inserts append rows (the files grow by doubling). Search scans the memmap in
+fixed-size chunks and merges per-chunk top-k, so resident memory stays at one
+chunk (CHUNK_ROWS x dim float32) however many vectors are stored; the OS page
+cache holds the rest. One million 512-d vectors is ~1 GiB on disk. NumPy is
+imported when an index is first used, not when this module is.
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    import numpy as np
+
+CHUNK_ROWS = 16384
+INITIAL_CAPACITY = 1024
+
+
+class VectorIndex:
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+        self._db = sqlite3.connect(os.path.join(path, "meta.sqlite"), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value INTEGER)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, kind INTEGER, key TEXT UNIQUE, payload TEXT)")
+        self._db.commit()
+
+        stored_dim = self._info("dim")
+        if stored_dim is not None and stored_dim != dim:
+            raise ValueError(f"Index at {path} holds {stored_dim}-d vectors, not {dim}-d; use a new VECTOR_INDEX_PATH")
+        self._set_info("dim", dim)
+        self.count = self._info("count") or 0
+        self._capacity = 0
+        self._vectors: Optional["np.memmap"] = None
+        self._kinds: Optional["np.memmap"] = None
+        self._open(max(INITIAL_CAPACITY, self._file_rows()))
+
+    # --- storage helpers ---
+
+    def _info(self, key: str) -> Optional[int]:
+        row = self._db.execute("SELECT value FROM info WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_info(self, key: str, value: int) -> None:
+        self._db.execute("INSERT OR REPLACE INTO info VALUES (?, ?)", (key, value))
+        self._db.commit()
+
+    def _file_rows(self) -> int:
+        vec_path = os.path.join(self.path, "vectors.f16")
+        if not os.path.exists(vec_path):
+            return 0
+        return os.path.getsize(vec_path) // (self.dim * 2)
+
+    def _open(self, capacity: int) -> None:
+        import numpy as np
+        for name, width in (("vectors.f16", self.dim * 2), ("kinds.u8", 1)):
+            file_path = os.path.join(self.path, name)
+            with open(file_path, "ab") as f:
+                if f.tell() < capacity * width:
+                    f.truncate(capacity * width)
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._vectors = np.memmap(os.path.join(self.path, "vectors.f16"), dtype=np.float16, mode="r+", shape=(capacity, self.dim))
+        self._kinds = np.memmap(os.path.join(self.path, "kinds.u8"), dtype=np.uint8, mode="r+", shape=(capacity,))
+        self._capacity = capacity
+
+    # --- public API ---
+
+    def add(self, vectors: "np.ndarray", payloads: Sequence[Dict], kind: int = 0,
+            keys: Optional[Sequence[str]] = None) -> List[int]:
+        """
+        Append L2-normalised `vectors` with their JSON payloads; returns the new
+        row ids. Rows whose `keys` entry is already stored are skipped.
+        """
+        import numpy as np
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if len(vectors) != len(payloads):
+            raise ValueError("vectors and payloads differ in length")
+        keys = list(keys) if keys is not None else [None] * len(payloads)
+        with self._lock:
+            known = {
+                k for (k,) in self._db.execute(
+                    f"SELECT key FROM items WHERE key IN ({','.join('?' * len(keys))})", keys
+                ).fetchall()
+            } if any(keys) else set()
+            fresh = [i for i, k in enumerate(keys) if k is None or k not in known]
+            # also drop duplicates within this call
+            seen = set()
+            fresh = [i for i in fresh if keys[i] is None or not (keys[i] in seen or seen.add(keys[i]))]
+            if not fresh:
+                return []
+            vectors = vectors[fresh]
+            payloads = [payloads[i] for i in fresh]
+            keys = [keys[i] for i in fresh]
+            start = self.count
+            end = start + len(vectors)
+            if end > self._capacity:
+                capacity = self._capacity
+                while capacity < end:
+                    capacity *= 2
+                self._open(capacity)
+            self._vectors[start:end] = vectors.astype(np.float16)
+            self._kinds[start:end] = kind
+            self._vectors.flush()
+            self._kinds.flush()
+            self._db.executemany(
+                "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?)",
+                [(start + i, kind, k, json.dumps(p)) for i, (k, p) in enumerate(zip(keys, payloads))],
+            )
+            self.count = end
+            self._db.execute("INSERT OR REPLACE INTO info VALUES ('count', ?)", (end,))
+            self._db.commit()
+        return list(range(start, end))
+
+    def search(self, vector: "np.ndarray", k: int = 5, kind: Optional[int] = None, min_score: float = -1.0) -> List[Dict]:
+        """Top-k rows by cosine similarity: [{"id", "score", "payload"}], best first."""
+        import numpy as np
+        query = np.asarray(vector, dtype=np.float32).reshape(self.dim)
+        count = self.count
+        best_ids = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+
+        for start in range(0, count, CHUNK_ROWS):
+            end = min(start + CHUNK_ROWS, count)
+            scores = self._vectors[start:end].astype(np.float32) @ query
+            if kind is not None:
+                scores[self._kinds[start:end] != kind] = -np.inf
+            if len(scores) > k:
+                top = np.argpartition(-scores, k)[:k]
+            else:
+                top = np.arange(len(scores))
+            best_ids = np.concatenate([best_ids, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+            if len(best_ids) > k:
+                keep = np.argpartition(-best_scores, k)[:k]
+                best_ids, best_scores = best_ids[keep], best_scores[keep]
+
+        order = np.argsort(-best_scores)
+        hits = [(int(best_ids[i]), float(best_scores[i])) for i in order if best_scores[i] >= min_score]
+        if not hits:
+            return []
+        with self._lock:
+            rows = dict(self._db.execute(
+                f"SELECT id, payload FROM items WHERE id IN ({','.join('?' * len(hits))})", [h[0] for h in hits]
+            ).fetchall())
+        return [{"id": i, "score": round(s, 4), "payload": json.loads(rows[i])} for i, s in hits if i in rows]
+
+    def __len__(self) -> int:
+        return self.count
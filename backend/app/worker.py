@@ -0,0 +1,28 @@
+import argparse
+import json
+from app.agents.distributed import run_worker
+from app.config.settings import settings
+from app.utils.job_queue import get_queue
+from app.utils.metrics import start_metrics_server
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.worker", description="Serve distributed-mode tasks from QUEUE_URL")
+    parser.add_argument("--topics", default=None, help="Comma-separated topics (browser,http,llm); default WORKER_TOPICS")
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--job", default=None, help="Print the task results of a job id and exit")
+    args = parser.parse_args()
+
+    if args.job:
+        print(json.dumps(get_queue().job_results(args.job), indent=2))
+        return
+
+    if settings.METRICS_PORT:
+        start_metrics_server(settings.METRICS_PORT, settings.METRICS_HOST)
+
+    topics = [t.strip() for t in (args.topics or settings.WORKER_TOPICS).split(",") if t.strip()]
+    run_worker(topics, concurrency=args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
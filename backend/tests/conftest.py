@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the `app` package the same way the entry points do: from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.settings import settings  # noqa: E402
+
+
+@pytest.fixture
+def isolated_settings(tmp_path, monkeypatch):
+    """Point every on-disk store at a temp dir and turn off the ones a test does not opt into."""
+    for key, value in {
+        "RESULTS_DB": "",
+        "VECTOR_INDEX_PATH": "",
+        "CONNECTOR_STATS_DB": "",
+        "CHECKPOINT_BACKEND": "none",
+        "CHECKPOINT_DB": str(tmp_path / "checkpoints.sqlite"),
+        "QUEUE_URL": f"sqlite:///{tmp_path / 'queue.sqlite'}",
+        "PROFILE_DIR": str(tmp_path / "profiles"),
+        "LLM_CACHE_TTL": 0,
+        "SPECULATIVE_PREFETCH": False,
+        "EXECUTION_MODE": "local",
+        "PROFILE": False,
+        "PROMPT_OVERRIDES": None,
+    }.items():
+        monkeypatch.setattr(settings, key, value)
+    return settings
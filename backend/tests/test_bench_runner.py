@@ -0,0 +1,25 @@
+from app.bench import runner
+from app.tools import web_tools
+
+
+def test_repeated_queries_reach_the_connectors(isolated_settings, tmp_path, monkeypatch):
+    for key, value in runner.ISOLATED_SETTINGS.items():
+        monkeypatch.setattr(isolated_settings, key, value)
+    monkeypatch.setattr(isolated_settings, "REDDIT_FIXTURES_PATH", str(tmp_path))
+    monkeypatch.setattr(web_tools, "_results_cache", web_tools.TTLCache(maxsize=1024))
+    monkeypatch.setattr(web_tools.RedditConnector, "_cache", web_tools.TTLCache())
+
+    calls = []
+    for name, connector in web_tools.CONNECTORS.items():
+        if name != "reddit":
+            monkeypatch.setattr(connector, "fetch_signals",
+                                lambda query, limit=5, name=name: calls.append(name) or [{"source": name, "title": query}])
+    listings = []
+    monkeypatch.setattr(web_tools.RedditConnector, "_load_fixture", lambda self, variant: listings.append(variant) or {})
+
+    for _ in range(2):
+        runner.SCENARIOS["search_all"]("hospital queue management")
+
+    assert sorted(calls) == sorted(["yc", "ph", "devpost"] * 2)
+    variants = web_tools.CONNECTORS["reddit"]._variants("hospital queue management")
+    assert sorted(listings) == sorted(variants * 2)
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langgraph")
+
+from app.agents import master_agent  # noqa: E402
+from app.utils import checkpointing  # noqa: E402
+from app.utils.schemas import SynthOutput  # noqa: E402
+
+
+@pytest.fixture
+def graph(isolated_settings, monkeypatch):
+    """Master graph over a memory checkpointer with stub nodes; returns per-node call counts."""
+    monkeypatch.setattr(isolated_settings, "CHECKPOINT_BACKEND", "memory")
+    monkeypatch.setattr(isolated_settings, "MASTER_AGENT_RETRIES", 0)
+    monkeypatch.setattr(checkpointing, "_checkpointer", None)
+    monkeypatch.setattr(master_agent, "_master_chain", None)
+    calls = {"router": [], "web_intel": [], "report_generator": [], "synthesizer": []}
+    failing = set()
+
+    def node(name, update):
+        def run(state):
+            calls[name].append(state.query)
+            if name in failing:
+                raise RuntimeError(f"{name} failed")
+            return update(state)
+        return run
+
+    monkeypatch.setitem(master_agent.NODES, "router", node("router", lambda s: {"selected_agents": ["Web Intelligence Agent"]}))
+    monkeypatch.setitem(master_agent.NODES, "web_intel", node("web_intel", lambda s: {"results": {"web_intel": s.query}}))
+    monkeypatch.setitem(master_agent.NODES, "report_generator", node("report_generator", lambda s: {"results": s.results}))
+    monkeypatch.setitem(master_agent.NODES, "synthesizer", node(
+        "synthesizer", lambda s: {"final_output": SynthOutput(final_summary=s.results["web_intel"], recommendations="")}
+    ))
+    return calls, failing
+
+
+def run(query, job_id):
+    return asyncio.run(master_agent.run_master_agent(query, raise_errors=True, job_id=job_id))
+
+
+def test_failed_job_resumes_from_last_completed_node(graph):
+    calls, failing = graph
+    failing.add("synthesizer")
+    with pytest.raises(RuntimeError):
+        run("invoicing for plumbers", "job-1")
+    failing.clear()
+
+    output = run("invoicing for plumbers", "job-1")
+
+    assert output.final_summary == "invoicing for plumbers"
+    assert calls["router"] == ["invoicing for plumbers"]
+    assert calls["web_intel"] == ["invoicing for plumbers"]
+    assert len(calls["synthesizer"]) == 2
+
+
+def test_reused_job_id_with_another_query_starts_over(graph):
+    calls, failing = graph
+    failing.add("synthesizer")
+    with pytest.raises(RuntimeError):
+        run("invoicing for plumbers", "job-1")
+    failing.clear()
+
+    output = run("meal planning for students", "job-1")
+
+    assert output.final_summary == "meal planning for students"
+    assert calls["web_intel"] == ["invoicing for plumbers", "meal planning for students"]
+
+
+def test_finished_job_checkpoints_are_deleted(graph):
+    calls, _ = graph
+    run("invoicing for plumbers", "job-1")
+
+    snapshot = master_agent.get_master_chain().get_state({"configurable": {"thread_id": "job-1"}})
+    assert not snapshot.values
+
+    # The same id afterwards is a new run, not a replay of the stored report
+    output = run("meal planning for students", "job-1")
+    assert output.final_summary == "meal planning for students"
+    assert len(calls["router"]) == 2
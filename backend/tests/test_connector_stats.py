@@ -0,0 +1,57 @@
+import pytest
+
+from app.tools import connector_stats
+
+
+@pytest.fixture
+def stats_db(isolated_settings, tmp_path, monkeypatch):
+    monkeypatch.setattr(connector_stats.settings, "CONNECTOR_STATS_DB", str(tmp_path / "stats.sqlite"))
+    monkeypatch.setattr(connector_stats.settings, "CONNECTOR_STATS_WINDOW", 5)
+    monkeypatch.setattr(connector_stats, "_conn", None)
+    yield connector_stats._connect()
+    connector_stats._conn.close()
+    connector_stats._conn = None
+
+
+def _count(conn, sql, *args):
+    return conn.execute(sql, args).fetchone()[0]
+
+
+def test_fetches_keep_the_last_window_per_connector(stats_db):
+    for i in range(12):
+        connector_stats.record_fetch("yc", "api tooling", latency=float(i), ok=True, docs=1)
+    connector_stats.record_fetch("ph", "api tooling", latency=1.0, ok=False, docs=0)
+
+    assert _count(stats_db, "SELECT COUNT(*) FROM fetches WHERE connector='yc'") == 5
+    assert _count(stats_db, "SELECT MIN(latency) FROM fetches WHERE connector='yc'") == 7.0
+    assert _count(stats_db, "SELECT COUNT(*) FROM fetches WHERE connector='ph'") == 1
+
+
+def test_yields_keep_the_last_window_per_connector_and_class(stats_db):
+    for _ in range(8):
+        connector_stats.record_yield("api tooling", {"yc": 4, "ph": 2}, {"yc": 3})
+    connector_stats.record_yield("restaurant inventory", {"yc": 4}, {"yc": 1})
+
+    assert _count(stats_db, "SELECT COUNT(*) FROM yields WHERE connector='yc' AND query_class='developer'") == 5
+    assert _count(stats_db, "SELECT COUNT(*) FROM yields WHERE connector='ph'") == 5
+    assert _count(stats_db, "SELECT COUNT(*) FROM yields WHERE query_class='business'") == 1
+    assert connector_stats.connector_stats("yc", "api tooling")["runs"] == 5
+
+
+def test_sources_that_never_yield_are_ranked_and_skipped(stats_db, monkeypatch):
+    monkeypatch.setattr(connector_stats.settings, "CONNECTOR_STATS_WINDOW", 50)
+    for _ in range(20):
+        connector_stats.record_yield("api tooling", {"yc": 3, "devpost": 2, "ph": 0, "reddit": 1}, {"yc": 3, "devpost": 1})
+
+    schedule, skipped = connector_stats.plan(["yc", "ph", "devpost", "reddit"], "api tooling", explore=False)
+    assert [name for name, _ in schedule] == ["yc", "devpost"]
+    assert sorted(skipped) == ["ph", "reddit"]
+
+
+def test_plan_without_exploration_is_repeatable(stats_db, monkeypatch):
+    monkeypatch.setattr(connector_stats.settings, "SOURCE_EXPLORE_RATE", 1.0)
+    for _ in range(5):
+        connector_stats.record_yield("api tooling", {"yc": 3, "ph": 1}, {"yc": 3})
+
+    assert connector_stats.plan(["yc", "ph"], "api tooling")[1] == []
+    assert connector_stats.plan(["yc", "ph"], "api tooling", explore=False)[1] == ["ph"]
@@ -0,0 +1,29 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.bench.runner import measure_import
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Loaded only by the code paths that need them, never by importing the pipeline
+HEAVY_MODULES = (
+    "numpy", "requests", "openai", "httpx", "langgraph", "playwright", "bs4",
+    "supabase", "reportlab", "pandas", "redis", "sentence_transformers",
+)
+# Seconds for a cold `import app.agents.master_agent` (median of a few runs)
+IMPORT_BUDGET = float(os.getenv("IMPORT_BUDGET", "1.5"))
+
+
+@pytest.mark.parametrize("module", ["app.agents.master_agent", "app.agents.batch_agent", "app.agents.refresh_agent"])
+def test_pipeline_import_does_not_load_heavy_dependencies(module):
+    code = f"import json, sys; import {module}; print(json.dumps(sorted(set({HEAVY_MODULES!r}) & set(sys.modules))))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=BACKEND_DIR, check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == []
+
+
+def test_pipeline_cold_import_within_budget():
+    row = measure_import(runs=3)
+    assert row["p50_ms"] <= IMPORT_BUDGET * 1000, f"cold import took {row['p50_ms']}ms"
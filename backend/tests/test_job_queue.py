@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+
+from app.agents import distributed
+from app.utils import job_queue
+from app.utils.job_queue import RemoteTaskError, SqliteJobQueue
+
+
+@pytest.fixture
+def queue_path(isolated_settings, tmp_path, monkeypatch):
+    path = str(tmp_path / "queue.sqlite")
+    queue = SqliteJobQueue(path)
+    monkeypatch.setattr(job_queue, "_queue", queue)
+    return path
+
+
+def test_every_task_is_claimed_exactly_once_under_concurrency(queue_path):
+    queue = job_queue.get_queue()
+    task_ids = {queue.submit("http", {"n": i}, job_id="job") for i in range(200)}
+    claimed, lock = [], threading.Lock()
+
+    def worker(name):
+        # One connection per worker, as separate worker processes would have
+        own = SqliteJobQueue(queue_path)
+        while True:
+            task = own.claim(["http"], name)
+            if task is None:
+                return
+            own.complete(task["id"], task["payload"]["n"])
+            with lock:
+                claimed.append(task["id"])
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(claimed) == sorted(task_ids)
+    results = queue.job_results("job")
+    assert len(results) == 200
+    assert all(r["status"] == "done" for r in results)
+
+
+def test_claim_takes_oldest_task_on_served_topics(queue_path):
+    queue = job_queue.get_queue()
+    queue.submit("browser", {})
+    first = queue.submit("http", {})
+    queue.submit("http", {})
+
+    assert queue.claim(["http"], "w")["id"] == first
+    assert queue.status(first)["status"] == "running"
+
+
+def test_stale_claim_is_handed_to_another_worker(queue_path, monkeypatch):
+    queue = job_queue.get_queue()
+    task_id = queue.submit("http", {})
+    assert queue.claim(["http"], "dead")["id"] == task_id
+    assert queue.claim(["http"], "w") is None
+
+    monkeypatch.setattr(job_queue.settings, "QUEUE_VISIBILITY_TIMEOUT", 0)
+    time.sleep(0.01)
+    assert queue.claim(["http"], "w")["id"] == task_id
+
+
+def test_withdraw_only_before_claim(queue_path):
+    queue = job_queue.get_queue()
+    pending = queue.submit("http", {})
+    assert queue.withdraw(pending)
+    assert queue.status(pending) is None
+
+    claimed = queue.submit("http", {})
+    queue.claim(["http"], "w")
+    assert not queue.withdraw(claimed)
+
+
+def test_fail_records_error(queue_path):
+    queue = job_queue.get_queue()
+    task_id = queue.submit("http", {})
+    queue.claim(["http"], "w")
+    queue.fail(task_id, "ValueError: boom")
+    record = queue.wait(task_id, timeout=1)
+    assert record["status"] == "error"
+    assert record["error"] == "ValueError: boom"
+
+
+def test_run_remote_falls_back_when_no_worker_claims(queue_path, monkeypatch):
+    monkeypatch.setattr(job_queue.settings, "QUEUE_CLAIM_TIMEOUT", 0.05)
+
+    assert job_queue.run_remote("http", {}, fallback=lambda: "local") == "local"
+    # The withdrawn task must not run again on a worker that turns up later
+    assert job_queue.get_queue().claim(["http"], "w") is None
+
+
+def test_run_remote_returns_worker_result_and_raises_worker_errors(queue_path, monkeypatch):
+    monkeypatch.setattr(job_queue.settings, "QUEUE_CLAIM_TIMEOUT", 5)
+    monkeypatch.setattr(distributed, "execute", lambda task: {"echo": task["payload"]["value"]})
+    stop = threading.Event()
+    worker = threading.Thread(target=distributed._work, args=(["http"], "w", stop, 0.01), daemon=True)
+    worker.start()
+    try:
+        assert job_queue.run_remote("http", {"value": 7}, fallback=lambda: None) == {"echo": 7}
+
+        monkeypatch.setattr(distributed, "execute", lambda task: 1 / 0)
+        with pytest.raises(RemoteTaskError):
+            job_queue.run_remote("http", {}, fallback=lambda: None)
+    finally:
+        stop.set()
+        worker.join()
+
+
+def test_finished_tasks_are_swept_after_the_result_ttl(queue_path, monkeypatch):
+    queue = job_queue.get_queue()
+    monkeypatch.setattr(queue, "SWEEP_INTERVAL", 0)
+    monkeypatch.setattr(job_queue.settings, "QUEUE_RESULT_TTL", 0.05)
+    old = queue.submit("http", {}, job_id="job")
+    queue.claim(["http"], "w")
+    queue.complete(old, 1)
+    pending = queue.submit("http", {}, job_id="job")
+    time.sleep(0.1)
+
+    fresh = queue.submit("llm", {}, job_id="job")
+    queue.claim(["llm"], "w")
+    queue.complete(fresh, 2)
+
+    assert queue.status(old) is None
+    assert [r["id"] for r in queue.job_results("job")] == [pending, fresh]
@@ -0,0 +1,86 @@
+import json
+import random
+
+import pytest
+
+from app.utils.json_stream import SynthStreamParser
+
+OUTPUT = {
+    "final_summary": 'Quotes " and \\ backslashes,\nnew lines,\ttabs, café and \U0001F680 emoji',
+    "tables": [
+        {"title": "Competitors", "columns": ["name", "note"], "rows": [["A", "has {braces} and [brackets]"]]},
+        {"title": "Empty", "columns": [], "rows": []},
+    ],
+    "charts": [{"type": "bar", "data": {"labels": ["x"], "values": [1]}}],
+    "recommendations": "Ship it /now/",
+}
+
+
+def _chunks(text, sizes):
+    i = 0
+    for size in sizes:
+        if i >= len(text):
+            return
+        yield text[i:i + size]
+        i += size
+    if i < len(text):
+        yield text[i:]
+
+
+def _run(text, sizes):
+    parser = SynthStreamParser()
+    events = []
+    for chunk in _chunks(text, sizes):
+        events.extend(parser.feed(chunk))
+    return events
+
+
+def _fields(events):
+    fields = {}
+    for event in events:
+        if event["type"] == "field":
+            fields[event["field"]] = fields.get(event["field"], "") + event["delta"]
+    return fields
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("seed", range(20))
+def test_events_do_not_depend_on_chunk_boundaries(seed, ensure_ascii):
+    text = json.dumps(OUTPUT, ensure_ascii=ensure_ascii, indent=2 if seed % 2 else None)
+    rng = random.Random(seed)
+    events = _run(text, [rng.randint(1, 7) for _ in range(len(text))])
+
+    assert _fields(events) == {
+        "final_summary": OUTPUT["final_summary"],
+        "recommendations": OUTPUT["recommendations"],
+    }
+    assert [e["value"] for e in events if e["type"] == "table"] == OUTPUT["tables"]
+    assert [e["index"] for e in events if e["type"] == "table"] == [0, 1]
+    assert [e["value"] for e in events if e["type"] == "chart"] == OUTPUT["charts"]
+
+
+def test_single_character_chunks_split_escapes_and_surrogate_pairs():
+    text = json.dumps({"final_summary": "a\"b\\c\U0001F680dé"})
+    assert "\\ud83d\\ude80" in text
+    events = _run(text, [1] * len(text))
+    assert _fields(events) == {"final_summary": "a\"b\\c\U0001F680dé"}
+
+
+def test_prefix_before_the_object_is_skipped():
+    text = 'Here is the report:\n```json\n' + json.dumps(OUTPUT) + "\n```"
+    events = _run(text, [5] * len(text))
+    assert _fields(events)["final_summary"] == OUTPUT["final_summary"]
+    assert len([e for e in events if e["type"] == "table"]) == 2
+
+
+def test_nested_strings_and_keys_are_not_streamed():
+    text = json.dumps({"meta": {"final_summary": "nested"}, "title": "final_summary", "final_summary": "top"})
+    assert _fields(_run(text, [3] * len(text))) == {"final_summary": "top"}
+
+
+def test_incomplete_stream_reports_progress_so_far():
+    text = json.dumps(OUTPUT)
+    cut = text.index("Competitors")
+    events = _run(text[:cut], [4] * cut)
+    assert _fields(events) == {"final_summary": OUTPUT["final_summary"]}
+    assert not [e for e in events if e["type"] == "table"]
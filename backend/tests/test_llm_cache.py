@@ -0,0 +1,51 @@
+import contextvars
+import threading
+
+import pytest
+
+from app.utils import llm
+
+
+@pytest.fixture
+def created(isolated_settings, monkeypatch):
+    calls = []
+    monkeypatch.setattr(llm, "_responses", llm.TTLCache(maxsize=16))
+    monkeypatch.setattr(llm, "_create", lambda client, kwargs: calls.append(kwargs) or f"response {len(calls)}")
+    return calls
+
+
+def test_identical_requests_share_a_response_only_inside_the_scope(created):
+    request = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+    assert llm.chat_completion(**request) != llm.chat_completion(**request)
+
+    with llm.shared_response_cache():
+        first = llm.chat_completion(**request)
+        handed_off = []
+        worker = threading.Thread(target=contextvars.copy_context().run,
+                                  args=(lambda: handed_off.append(llm.chat_completion(**request)),))
+        worker.start()
+        worker.join()
+        assert handed_off == [first]
+    assert len(created) == 3
+
+
+def test_unrelated_requests_are_not_cached_while_a_batch_runs(created):
+    request = {"model": "m", "messages": [{"role": "user", "content": "interactive"}]}
+    in_batch = threading.Event()
+    done = threading.Event()
+
+    def batch():
+        with llm.shared_response_cache():
+            in_batch.set()
+            done.wait(5)
+
+    runner = threading.Thread(target=batch)
+    runner.start()
+    try:
+        in_batch.wait(5)
+        llm.chat_completion(**request)
+        llm.chat_completion(**request)
+    finally:
+        done.set()
+        runner.join()
+    assert len(created) == 2
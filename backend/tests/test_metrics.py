@@ -0,0 +1,11 @@
+from app.utils import metrics
+
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter("test_escaped_total", "Label escaping", ["agent"])
+    try:
+        counter.inc(agent='say "hi"\\\nbye')
+        lines = [line for line in metrics.render_prometheus().splitlines() if line.startswith("test_escaped_total{")]
+        assert lines == ['test_escaped_total{agent="say \\"hi\\"\\\\\\nbye"} 1']
+    finally:
+        metrics._registry.remove(counter)
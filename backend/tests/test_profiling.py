@@ -0,0 +1,36 @@
+import contextvars
+import threading
+
+from app.bench import recorder
+from app.utils import profiling
+
+
+def test_cassette_is_only_seen_by_its_own_context(tmp_path):
+    seen = {}
+
+    def other_run():
+        seen["other"] = recorder.active_cassette()
+
+    with recorder.use_cassette(str(tmp_path / "c.json"), mode="record") as cassette:
+        unrelated = threading.Thread(target=other_run)
+        unrelated.start()
+        unrelated.join()
+        handed_off = threading.Thread(
+            target=contextvars.copy_context().run, args=(lambda: seen.update(child=recorder.active_cassette()),)
+        )
+        handed_off.start()
+        handed_off.join()
+        assert recorder.intercept("http", {"url": "x"}, lambda: "live") == "live"
+
+    assert seen == {"other": None, "child": cassette}
+    assert recorder.active_cassette() is None
+    assert len(cassette.entries) == 1
+
+
+def test_only_one_run_is_profiled_at_a_time(isolated_settings):
+    with profiling.profile_run("job-a", "first") as first:
+        with profiling.profile_run("job-b", "second") as second:
+            assert second is None
+        assert profiling.active() is first
+    with profiling.profile_run("job-c", "third") as third:
+        assert third is not None
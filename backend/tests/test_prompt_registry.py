@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from app.utils import prompt_registry
+
+
+@pytest.fixture
+def registry(isolated_settings, monkeypatch):
+    monkeypatch.setattr(prompt_registry, "_registry", {})
+    monkeypatch.setattr(prompt_registry, "_context_caches", prompt_registry.TTLCache(maxsize=64))
+    return isolated_settings
+
+
+def test_messages_are_static_first(registry):
+    kwargs = prompt_registry.request("web_intel_tool", "m", query="queue apps")
+    assert [m["role"] for m in kwargs["messages"]] == ["system", "user"]
+    assert kwargs["messages"][1]["content"] == "queue apps"
+    assert "extra_body" not in kwargs
+
+
+def test_overrides_file(registry, tmp_path, monkeypatch):
+    path = tmp_path / "prompts.json"
+    path.write_text(json.dumps({"web_intel_tool": {"system": "Be brief."}}))
+    monkeypatch.setattr(registry, "PROMPT_OVERRIDES", str(path))
+    assert prompt_registry.request("web_intel_tool", "m", query="q")["messages"][0]["content"] == "Be brief."
+
+
+def test_large_prefixes_are_sent_as_cached_content(registry, monkeypatch):
+    monkeypatch.setattr(registry, "LLM_CONTEXT_CACHE", "gemini")
+    created = []
+    monkeypatch.setattr(prompt_registry, "_create_gemini_cache",
+                        lambda model, template: created.append(template.name) or f"cachedContents/{template.name}")
+
+    # Built-in prompts sit below the default minimum, so nothing is cached
+    assert "extra_body" not in prompt_registry.request("master", "m", docs_array="[]", summary_array="[]")
+
+    monkeypatch.setattr(registry, "LLM_CONTEXT_CACHE_MIN_TOKENS", 1)
+    for _ in range(2):
+        kwargs = prompt_registry.request("master", "m", docs_array="[]", summary_array="[]")
+        assert [m["role"] for m in kwargs["messages"]] == ["user"]
+        assert kwargs["extra_body"] == {"extra_body": {"google": {"cached_content": "cachedContents/master"}}}
+    assert created == ["master"]
+
+
+def test_failed_cache_creation_falls_back_to_inline_prompt(registry, monkeypatch):
+    monkeypatch.setattr(registry, "LLM_CONTEXT_CACHE", "gemini")
+    monkeypatch.setattr(registry, "LLM_CONTEXT_CACHE_MIN_TOKENS", 1)
+    monkeypatch.setattr(prompt_registry, "_create_gemini_cache", lambda model, template: False)
+
+    kwargs = prompt_registry.request("master", "m", docs_array="[]", summary_array="[]")
+    assert [m["role"] for m in kwargs["messages"]] == ["system", "user"]
+    assert "extra_body" not in kwargs
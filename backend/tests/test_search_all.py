@@ -0,0 +1,56 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.tools import web_tools
+
+
+@pytest.fixture
+def connectors(isolated_settings, monkeypatch):
+    monkeypatch.setattr(web_tools, "_results_cache", web_tools.TTLCache(maxsize=1024))
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(web_tools, "_connector_pool", pool)
+
+    def use(name, fetch):
+        monkeypatch.setattr(web_tools.CONNECTORS[name], "fetch_signals", fetch)
+    yield use
+    pool.shutdown(wait=True)
+
+
+def test_deadline_starts_when_the_connector_starts(connectors, isolated_settings, monkeypatch):
+    monkeypatch.setattr(isolated_settings, "CONNECTOR_DEFAULT_DEADLINE", 0.5)
+
+    def slow(name):
+        def fetch(query, limit=5):
+            time.sleep(0.3)
+            return [{"source": name, "title": query}]
+        return fetch
+    connectors("yc", slow("yc"))
+    connectors("ph", slow("ph"))
+
+    # One pool worker: ph queues behind yc and finishes 0.6s after submission
+    docs = web_tools.search_all("q", sources=["yc", "ph"])
+    assert [d["source"] for d in docs] == ["yc", "ph"]
+
+
+def test_connector_past_its_deadline_is_stopped(connectors, isolated_settings, monkeypatch):
+    monkeypatch.setattr(isolated_settings, "CONNECTOR_DEFAULT_DEADLINE", 0.1)
+    stopped = threading.Event()
+
+    def hangs(query, limit=5):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            try:
+                web_tools.check_cancelled()
+            except web_tools.FetchCancelled:
+                stopped.set()
+                raise
+            time.sleep(0.01)
+        return [{"source": "yc", "title": query}]
+    connectors("yc", hangs)
+
+    assert web_tools.search_all("q", sources=["yc"]) == []
+    assert stopped.wait(1)
+    assert web_tools._results_cache.get(("yc", "q", 5)) is None
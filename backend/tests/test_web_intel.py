@@ -0,0 +1,58 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.agents import web_intel_agent
+
+
+class FakePrefetch:
+    def __init__(self, query, limit, docs):
+        self.query, self.limit, self.sources, self.docs = query, limit, ["yc"], docs
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def result(self):
+        return None if self.cancelled else self.docs
+
+
+@pytest.fixture
+def tool_call(isolated_settings, monkeypatch):
+    searches = []
+
+    def use(args):
+        call = SimpleNamespace(function=SimpleNamespace(arguments=json.dumps(args)))
+        response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=[call], content=None))])
+        monkeypatch.setattr(web_intel_agent, "chat_completion", lambda **kwargs: response)
+    monkeypatch.setattr(web_intel_agent.prompt_registry, "request", lambda *args, **kwargs: {})
+    monkeypatch.setattr(web_intel_agent, "plan_sources", lambda query: ["yc", "ph"])
+    monkeypatch.setattr(web_intel_agent, "search_all", lambda query, limit, types, sources:
+                        searches.append((query, limit)) or [{"source": "searched"}])
+    monkeypatch.setattr(web_intel_agent, "analyze_documents", lambda user_query, search, docs: {"search": search, "docs": docs})
+    use.searches = searches
+    return use
+
+
+def test_prefetch_of_a_different_query_is_discarded(tool_call):
+    tool_call({"query": "queue management", "limit": 6})
+    prefetched = FakePrefetch("How do hospitals manage patient queues?", 6, [{"source": "prefetched"}])
+
+    out = web_intel_agent.handle_user_query("How do hospitals manage patient queues?", prefetched=prefetched)
+
+    assert prefetched.cancelled
+    assert tool_call.searches == [("queue management", 6)]
+    assert out["docs"] == [{"source": "searched"}]
+    assert out["search"]["query"] == "queue management"
+
+
+def test_prefetch_of_the_same_search_is_reused(tool_call):
+    tool_call({"query": "queue management", "limit": 6})
+    prefetched = FakePrefetch("queue management", 6, [{"source": "prefetched"}])
+
+    out = web_intel_agent.handle_user_query("queue management", prefetched=prefetched)
+
+    assert tool_call.searches == []
+    assert out["docs"] == [{"source": "prefetched"}]
+    assert out["search"] == {"query": "queue management", "limit": 6, "types": None, "sources": ["yc"]}